@@ -0,0 +1,334 @@
+"""
+agregaciones.py
+
+Motor de agregación de una sola pasada para el panel de análisis.
+
+En lugar de recorrer el catálogo una vez por estadística, se declara una
+lista de métricas y el motor las actualiza todas juntas mientras recorre
+los productos una única vez. Agregar una métrica nueva es agregar una
+entrada a METRICAS_PANEL, sin escribir otro bucle.
+
+Cada métrica implementa tres pasos:
+    inicial()              → estado vacío
+    actualizar(estado, p)  → suma el producto p al estado
+    resultado(estado)      → valor final
+
+Las métricas con `por=` calculan un valor por grupo (por ejemplo, por marca).
+
+Si `valor` y `por` son nombres de columna ("precio", "marca") en lugar de
+funciones, la métrica también se puede calcular vectorizada sobre un
+CatalogoColumnar (catalogo_columnar.py): el motor usa ese camino para las
+que lo permiten y hace una sola pasada por producto para el resto.
+"""
+
+import heapq
+from operator import attrgetter
+
+import numpy as np
+
+
+def a_numero(valor):
+    """Escalar de NumPy → número de Python (entero si no tiene decimales, como los precios)."""
+    valor = valor.item()
+    return int(valor) if isinstance(valor, float) and valor.is_integer() else valor
+
+
+def _extractor(campo):
+    """Devuelve una función producto → valor a partir de un nombre de columna o una función."""
+    if campo is None or callable(campo):
+        return campo
+    return attrgetter(campo)
+
+
+# ==========================================================
+#                    MÉTRICAS BÁSICAS
+# ==========================================================
+class Metrica:
+    """
+    Métrica base. `valor` extrae el número de cada producto y `por`
+    (opcional) la clave de grupo; si se pasa `por`, el resultado es un
+    diccionario { grupo : valor } en el orden en que aparecen los grupos.
+    Ambos pueden ser una función o el nombre de una columna.
+
+    `vacio`: nombre del grupo para los productos con clave vacía
+    (por ejemplo, "Desconocida" para los que no tienen marca).
+    """
+
+    def __init__(self, valor=None, por=None, vacio=None):
+        self.columna = valor if isinstance(valor, str) else None
+        self.columna_por = por if isinstance(por, str) else None
+        self.valor = _extractor(valor)
+        self.por = _extractor(por)
+        self.vacio = vacio
+
+    # --- Lo que define cada métrica, para un solo grupo ---
+    def _inicial(self):
+        raise NotImplementedError
+
+    def _actualizar(self, estado, producto):
+        raise NotImplementedError
+
+    def _resultado(self, estado):
+        return estado
+
+    # --- Manejo de grupos (común a todas) ---
+    def inicial(self):
+        return {} if self.por else self._inicial()
+
+    def actualizar(self, estado, producto):
+        if not self.por:
+            return self._actualizar(estado, producto)
+
+        grupo = self.por(producto)
+        if not grupo and self.vacio is not None:
+            grupo = self.vacio
+        if grupo not in estado:
+            estado[grupo] = self._inicial()
+        estado[grupo] = self._actualizar(estado[grupo], producto)
+        return estado
+
+    def resultado(self, estado):
+        if not self.por:
+            return self._resultado(estado)
+        return {grupo: self._resultado(e) for grupo, e in estado.items()}
+
+    # --- Cálculo vectorizado sobre un CatalogoColumnar ---
+    def _columnas(self, filas, catalogo):
+        """Valor de un grupo a partir de sus filas (arreglo de posiciones) en el catálogo."""
+        raise NotImplementedError
+
+    def vectorizable(self):
+        """True si la métrica usa columnas (no funciones) y sabe calcularse por filas."""
+        return ((self.valor is None or self.columna is not None)
+                and (self.por is None or self.columna_por is not None)
+                and type(self)._columnas is not Metrica._columnas)
+
+    def calcular_columnar(self, catalogo):
+        """Calcula la métrica sobre el catálogo en columnas, sin recorrer productos."""
+        if not self.por:
+            return self._columnas(np.arange(len(catalogo)), catalogo)
+
+        # Los códigos siguen el orden de aparición de los grupos: ordenar
+        # de forma estable por código deja los grupos en ese mismo orden
+        codigos, etiquetas = catalogo.codigos(self.columna_por, self.vacio)
+        orden = np.argsort(codigos, kind="stable")
+        cortes = np.flatnonzero(np.diff(codigos[orden])) + 1
+        return {
+            etiquetas[int(codigos[filas[0]])]: self._columnas(filas, catalogo)
+            for filas in np.split(orden, cortes) if len(filas)
+        }
+
+
+class Conteo(Metrica):
+    """Cantidad de productos."""
+
+    def _inicial(self):
+        return 0
+
+    def _actualizar(self, estado, producto):
+        return estado + 1
+
+    def _columnas(self, filas, catalogo):
+        return len(filas)
+
+
+class Suma(Metrica):
+    """Suma de `valor`."""
+
+    def _inicial(self):
+        return 0
+
+    def _actualizar(self, estado, producto):
+        return estado + self.valor(producto)
+
+    def _columnas(self, filas, catalogo):
+        return a_numero(catalogo.columna(self.columna)[filas].sum())
+
+
+class Promedio(Metrica):
+    """Promedio de `valor`, redondeado a `decimales`."""
+
+    def __init__(self, valor, por=None, decimales=2, vacio=None):
+        super().__init__(valor, por, vacio)
+        self.decimales = decimales
+
+    def _inicial(self):
+        return [0, 0]  # [total, cantidad]
+
+    def _actualizar(self, estado, producto):
+        estado[0] += self.valor(producto)
+        estado[1] += 1
+        return estado
+
+    def _resultado(self, estado):
+        total, cantidad = estado
+        return round(total / cantidad, self.decimales) if cantidad else None
+
+    def _columnas(self, filas, catalogo):
+        total = a_numero(catalogo.columna(self.columna)[filas].sum())
+        return self._resultado([total, len(filas)])
+
+
+class Minimo(Metrica):
+    """Valor mínimo de `valor`."""
+
+    def _inicial(self):
+        return None
+
+    def _actualizar(self, estado, producto):
+        v = self.valor(producto)
+        return v if estado is None or v < estado else estado
+
+    def _columnas(self, filas, catalogo):
+        return a_numero(catalogo.columna(self.columna)[filas].min()) if len(filas) else None
+
+
+class Maximo(Metrica):
+    """Valor máximo de `valor`."""
+
+    def _inicial(self):
+        return None
+
+    def _actualizar(self, estado, producto):
+        v = self.valor(producto)
+        return v if estado is None or v > estado else estado
+
+    def _columnas(self, filas, catalogo):
+        return a_numero(catalogo.columna(self.columna)[filas].max()) if len(filas) else None
+
+
+class Percentiles(Metrica):
+    """
+    Percentiles de `valor` (por ejemplo (25, 50, 75)).
+    Guarda los valores durante la pasada y los calcula al final.
+    """
+
+    def __init__(self, valor, percentiles=(25, 50, 75), por=None, vacio=None):
+        super().__init__(valor, por, vacio)
+        self.percentiles = percentiles
+
+    def _inicial(self):
+        return []
+
+    def _actualizar(self, estado, producto):
+        estado.append(self.valor(producto))
+        return estado
+
+    def _resultado(self, estado):
+        if not len(estado):
+            return {p: None for p in self.percentiles}
+        valores = np.percentile(np.asarray(estado, dtype=np.float64), self.percentiles)
+        return {p: round(float(v), 2) for p, v in zip(self.percentiles, valores)}
+
+    def _columnas(self, filas, catalogo):
+        return self._resultado(catalogo.columna(self.columna)[filas])
+
+
+class TopK(Metrica):
+    """
+    Los k productos con mayor `valor`, usando un heap de tamaño k
+    (no hace falta ordenar todo el catálogo). Con valores empatados
+    gana el que apareció antes, igual que sorted(..., reverse=True).
+    """
+
+    def __init__(self, k, valor, por=None, vacio=None):
+        super().__init__(valor, por, vacio)
+        self.k = k
+
+    def _inicial(self):
+        return [[], 0]  # [heap de (valor, -orden, producto), contador]
+
+    def _actualizar(self, estado, producto):
+        heap, orden = estado
+        clave = (self.valor(producto), -orden)
+        if len(heap) < self.k:
+            heapq.heappush(heap, (clave, producto))
+        elif self.k and clave > heap[0][0]:
+            heapq.heapreplace(heap, (clave, producto))
+        estado[1] = orden + 1
+        return estado
+
+    def _resultado(self, estado):
+        return [p for _, p in sorted(estado[0], key=lambda x: x[0], reverse=True)]
+
+    def _columnas(self, filas, catalogo):
+        mayores = indices_mayores(catalogo.columna(self.columna)[filas], self.k)
+        return [catalogo.producto(i) for i in filas[mayores].tolist()]
+
+
+def indices_mayores(valores, k):
+    """
+    Posiciones de los k valores más altos, de mayor a menor. Con valores
+    empatados gana la posición anterior (igual que sorted(..., reverse=True)).
+    """
+    total = len(valores)
+    if k <= 0 or total == 0:
+        return np.array([], dtype=np.int64)
+
+    if k < total:
+        # Solo ordenamos los que superan el k-ésimo valor más alto
+        umbral = np.partition(valores, total - k)[total - k]
+        candidatos = np.flatnonzero(valores >= umbral)
+    else:
+        candidatos = np.arange(total)
+
+    return candidatos[np.argsort(-valores[candidatos], kind="stable")][:k]
+
+
+# ==========================================================
+#                  MOTOR DE AGREGACIÓN
+# ==========================================================
+class MotorAgregacion:
+    """
+    Calcula un conjunto de métricas { nombre : Metrica } en una sola pasada.
+
+    `productos` puede ser cualquier iterable de productos o un
+    CatalogoColumnar; en ese caso las métricas vectorizables se calculan
+    sobre las columnas y solo las demás recorren los productos.
+    """
+
+    def __init__(self, metricas):
+        self.metricas = metricas
+
+    def calcular(self, productos):
+        resultados = {}
+        pares = list(self.metricas.items())
+
+        if hasattr(productos, "codigos"):
+            for nombre, metrica in pares:
+                if metrica.vectorizable():
+                    resultados[nombre] = metrica.calcular_columnar(productos)
+            pares = [(nombre, m) for nombre, m in pares if nombre not in resultados]
+
+        if pares:
+            estados = {nombre: m.inicial() for nombre, m in pares}
+            for p in productos:
+                for nombre, metrica in pares:
+                    estados[nombre] = metrica.actualizar(estados[nombre], p)
+            resultados.update((nombre, m.resultado(estados[nombre])) for nombre, m in pares)
+
+        # Mismo orden de claves que METRICAS_PANEL (o las métricas pedidas)
+        return {nombre: resultados[nombre] for nombre in self.metricas}
+
+
+# ==========================================================
+#              MÉTRICAS DEL PANEL DE ANÁLISIS
+# ==========================================================
+METRICAS_PANEL = {
+    "conteo_marcas": Conteo(por="marca", vacio="Desconocida"),
+    "promedios": Promedio("precio", por="marca"),
+    "total_por_marca": Suma("precio", por="marca"),
+    "minimo_por_marca": Minimo("precio", por="marca"),
+    "maximo_por_marca": Maximo("precio", por="marca"),
+    "percentiles_por_marca": Percentiles("precio", (25, 50, 75), por="marca"),
+    "top_5": TopK(5, "precio"),
+    "total_productos": Conteo(),
+}
+
+
+def calcular_panel(productos, metricas=None):
+    """
+    Calcula todas las métricas del panel de análisis en una sola pasada
+    (o vectorizadas, si `productos` es un CatalogoColumnar).
+    """
+    return MotorAgregacion(metricas or METRICAS_PANEL).calcular(productos)
@@ -0,0 +1,219 @@
+"""
+agrupar_duplicados.py
+
+Agrupa productos cuyas imágenes son iguales o casi iguales (pHash a
+distancia de Hamming <= radio) sobre todo el catálogo indexado.
+
+Comparar todos contra todos es O(n²). En cambio usamos "bandas":
+partimos el hash de 64 bits en (radio + 1) bandas. Si dos hashes difieren
+en a lo sumo `radio` bits, por el principio del palomar al menos una banda
+es idéntica en ambos. Entonces solo comparamos los hashes que comparten
+alguna banda, y verificamos la distancia real en esos candidatos.
+
+Resultado: un archivo JSON con el grupo de cada fila del índice binario,
+que usan la búsqueda (para no mostrar duplicados) y el panel de análisis.
+
+Uso:
+    python agrupar_duplicados.py
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from indice_binario import cargar_indice_binario
+
+# Archivo donde se guardan los grupos (junto a la caché de pHashes)
+GRUPOS_FILE = os.path.join(tempfile.gettempdir(), "product_image_clusters.json")
+
+# Distancia máxima para considerar dos imágenes "casi iguales"
+RADIO_DUPLICADOS = 4
+
+# Filas que se comparan de una vez dentro de un mismo balde (acota memoria)
+FILAS_POR_BLOQUE = 512
+
+
+# ==========================================================
+#                  UNION-FIND (conjuntos)
+# ==========================================================
+def _raiz(padres, x):
+    """Busca la raíz del conjunto de x, comprimiendo el camino."""
+    while padres[x] != x:
+        padres[x] = padres[padres[x]]
+        x = padres[x]
+    return x
+
+
+def _unir(padres, a, b):
+    ra, rb = _raiz(padres, a), _raiz(padres, b)
+    if ra != rb:
+        padres[max(ra, rb)] = min(ra, rb)
+
+
+# ==========================================================
+#            CANDIDATOS POR BANDAS Y VERIFICACIÓN
+# ==========================================================
+def _bandas(radio):
+    """Devuelve [(desplazamiento, máscara)] de las radio + 1 bandas de 64 bits."""
+    cantidad = radio + 1
+    anchos = [64 // cantidad + (1 if i < 64 % cantidad else 0) for i in range(cantidad)]
+
+    bandas = []
+    desplazamiento = 0
+    for ancho in anchos:
+        bandas.append((np.uint64(desplazamiento), np.uint64((1 << ancho) - 1)))
+        desplazamiento += ancho
+    return bandas
+
+
+def pares_cercanos(hashes, radio=RADIO_DUPLICADOS):
+    """
+    Devuelve un arreglo (k, 2) con los pares de posiciones (i < j) de `hashes`
+    cuya distancia de Hamming es <= radio. Se asume que `hashes` no tiene repetidos.
+    """
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    pares = []
+
+    for desplazamiento, mascara in _bandas(radio):
+        valores = (hashes >> desplazamiento) & mascara
+
+        # Agrupamos las posiciones por valor de la banda (baldes)
+        orden = np.argsort(valores, kind="stable")
+        cortes = np.flatnonzero(np.diff(valores[orden])) + 1
+
+        for balde in np.split(orden, cortes):
+            if len(balde) < 2:
+                continue
+
+            balde = np.sort(balde)
+            del_balde = hashes[balde]
+
+            # Comparamos el balde contra sí mismo por bloques de filas
+            for inicio in range(0, len(balde), FILAS_POR_BLOQUE):
+                filas = del_balde[inicio:inicio + FILAS_POR_BLOQUE]
+                dist = np.bitwise_count(filas[:, None] ^ del_balde[None, :])
+                i, j = np.nonzero(dist <= radio)
+                i = i + inicio
+                mantener = i < j
+                if mantener.any():
+                    pares.append(np.stack([balde[i[mantener]], balde[j[mantener]]], axis=1))
+
+    if not pares:
+        return np.empty((0, 2), dtype=np.int64)
+    return np.unique(np.concatenate(pares), axis=0)
+
+
+def agrupar_duplicados(hashes, radio=RADIO_DUPLICADOS):
+    """
+    Devuelve un arreglo con la etiqueta de grupo de cada posición de `hashes`.
+    Dos posiciones quedan en el mismo grupo si están conectadas por una
+    cadena de pares a distancia <= radio. La etiqueta es la menor posición
+    del grupo, así cada fila suelta es su propio grupo.
+    """
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    if not len(hashes):
+        return np.empty(0, dtype=np.int64)
+
+    # Los hashes idénticos ya son un grupo: trabajamos sobre los únicos
+    unicos, inversa = np.unique(hashes, return_inverse=True)
+
+    padres = list(range(len(unicos)))
+    for a, b in pares_cercanos(unicos, radio).tolist():
+        _unir(padres, a, b)
+    raices = np.array([_raiz(padres, x) for x in range(len(unicos))], dtype=np.int64)
+
+    # Etiqueta final = menor fila original de cada grupo
+    grupos_unicos = raices[inversa]
+    etiquetas = np.full(len(unicos), len(hashes), dtype=np.int64)
+    np.minimum.at(etiquetas, grupos_unicos, np.arange(len(hashes)))
+    return etiquetas[grupos_unicos]
+
+
+# ==========================================================
+#             GENERAR / LEER ARCHIVO DE GRUPOS
+# ==========================================================
+def generar_grupos(indice, radio=RADIO_DUPLICADOS, ruta=GRUPOS_FILE):
+    """
+    Agrupa las filas de un IndiceBinario y guarda el resultado:
+        {
+          "generacion": generación del índice,
+          "radio": radio usado,
+          "etiquetas": [grupo de cada fila],
+          "grupos": [ {"id", "tamano", "productos": [...]} ]  (solo grupos de 2+)
+        }
+    Devuelve el diccionario guardado.
+    """
+    etiquetas = agrupar_duplicados(indice.hashes, radio)
+
+    ids, tamanos = np.unique(etiquetas, return_counts=True)
+    grupos = []
+    for grupo_id, tamano in zip(ids.tolist(), tamanos.tolist()):
+        if tamano < 2:
+            continue
+        filas = np.flatnonzero(etiquetas == grupo_id).tolist()
+        grupos.append({
+            "id": grupo_id,
+            "tamano": tamano,
+            "productos": [indice.producto(f) for f in filas],
+        })
+    grupos.sort(key=lambda g: g["tamano"], reverse=True)
+
+    resultado = {
+        "generacion": indice.generacion,
+        "radio": radio,
+        "etiquetas": etiquetas.tolist(),
+        "grupos": grupos,
+    }
+
+    # Atómico: la recarga en vivo lo regenera mientras otros lo pueden estar leyendo
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(ruta) or ".")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, ensure_ascii=False)
+        os.replace(tmp, ruta)
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return resultado
+
+
+def cargar_grupos(generacion=None, ruta=GRUPOS_FILE):
+    """
+    Lee el archivo de grupos. Si se pasa `generacion` y no coincide con la
+    del índice con el que se generó, devuelve None (los grupos están viejos).
+    """
+    try:
+        with open(ruta, "r", encoding="utf-8") as f:
+            grupos = json.load(f)
+    except Exception:
+        return None
+
+    if generacion is not None and grupos.get("generacion") != generacion:
+        return None
+    return grupos
+
+
+# ==========================================================
+#                   PROGRAMA PRINCIPAL
+# ==========================================================
+if __name__ == "__main__":
+    indice = cargar_indice_binario()
+    if indice is None:
+        print("⚠ No hay índice de imágenes. Hacé una búsqueda o reconstruí el índice primero.")
+        sys.exit(1)
+
+    print(f"🖼  Agrupando {len(indice)} imágenes (radio {RADIO_DUPLICADOS})...")
+    inicio = time.perf_counter()
+    resultado = generar_grupos(indice)
+    duracion = time.perf_counter() - inicio
+
+    duplicados = sum(g["tamano"] for g in resultado["grupos"])
+    print(f"✔ {len(resultado['grupos'])} grupos con {duplicados} productos duplicados ({duracion:.2f} s)")
+    print(f"📄 Grupos guardados en: {GRUPOS_FILE}")
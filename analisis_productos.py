@@ -4,7 +4,7 @@ import sys
 # --- Ajuste para asegurar que podamos importar cargar_productos.py ---
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from cargar_productos import cargar_todos_los_productos
+from cargar_productos import ReporteValidacion, cargar_todos_los_productos
 
 
 # ============================================================
@@ -57,7 +57,9 @@ if __name__ == "__main__":
 
     print(f"📁 Leyendo archivos desde: {carpeta_data}")
 
-    productos = cargar_todos_los_productos(carpeta_data)
+    # Los errores de validación se anotan durante la carga (sin otro recorrido)
+    reporte = ReporteValidacion()
+    productos = cargar_todos_los_productos(carpeta_data, reporte)
 
     print(f"📦 Total productos cargados: {len(productos)}\n")
 
@@ -85,15 +87,16 @@ if __name__ == "__main__":
     print("\n---------------------------------------------\n")
 
     # ---------- 🔍 Análisis 4: Productos con errores ----------
-    errores = productos_con_errores(productos)
+    errores = reporte.errores
 
-    print("⚠ Productos con posibles errores (precio 0 / sin link / sin nombre):")
+    print("⚠ Productos con posibles errores (precio inválido o 0 / sin link / sin nombre):")
     if not errores:
         print("   ✔ No se encontraron errores")
     else:
-        for p in errores[:10]:  # Mostrar solo 10
-            print(f"   • {p.nombre} - ${p.precio} - {p.marca}")
+        for error in errores[:10]:  # Mostrar solo 10
+            motivos = ", ".join(error["motivos"])
+            print(f"   • {error['nombre']} - {error['precio_original']!r} ({error['archivo']}, fila {error['fila']}): {motivos}")
 
         print(f"   Total con errores: {len(errores)} productos")
-
-
+        for motivo, cantidad in reporte.por_motivo().items():
+            print(f"   • {motivo}: {cantidad}")
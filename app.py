@@ -1,17 +1,17 @@
 # Importamos Flask y funciones útiles para renderizar templates y manejar formularios
-from flask import Flask, render_template, request
+from flask import Flask, jsonify, render_template, request
+from PIL import Image
+from io import BytesIO
+import base64
 import os
 
 # Importamos nuestras funciones internas para cargar productos y buscar por imagen
-from cargar_productos import cargar_todos_los_productos
-from buscar_por_imagen import buscar_por_imagen_phash
+from catalogo_vivo import CatalogoVivo
+from buscar_por_imagen import buscar_por_imagen_phash, buscar_por_imagenes_phash, IndiceResidente
+from cache_consultas import CacheConsultas
 
-# Importamos funciones para el análisis estadístico de los productos
-from analisis_productos import (
-    productos_por_marca,
-    precio_promedio_por_marca,
-    top_5_productos_mas_caros
-)
+# Estadísticas del panel precalculadas por generación del catálogo
+from snapshot_analisis import SnapshotAnalisis
 
 # ================================
 #   CARGA INICIAL DE PRODUCTOS
@@ -20,12 +20,91 @@ from analisis_productos import (
 # Armamos la ruta hacia la carpeta /data dentro del proyecto
 CARPETA_DATA = os.path.join(os.path.dirname(__file__), "data")
 
-# Cargamos todos los productos al iniciar el servidor (solo una vez)
-# Esto evita recargar JSONs cada vez que alguien entra al sitio
-PRODUCTOS = cargar_todos_los_productos(CARPETA_DATA)
+# Cargamos todos los productos al iniciar el servidor (una sola vez).
+# Si cambian los JSON de data/, CATALOGO.recargar() relee solo esos archivos
+CATALOGO = CatalogoVivo(CARPETA_DATA)
+
+# Índice de búsqueda por imagen residente en memoria: al iniciar se sincroniza
+# con el catálogo (solo baja lo nuevo) y se reemplaza de forma atómica con
+# INDICE.refrescar(...) si hace falta
+INDICE = IndiceResidente(CATALOGO.productos)
+
+# Cada recarga del catálogo sincroniza el índice antes de publicarse
+CATALOGO.indice = INDICE
+
+# Estadísticas del panel de análisis: se calculan una vez por generación del
+# catálogo, sobre los productos ya cargados, y se sirven directamente
+SNAPSHOT_ANALISIS = SnapshotAnalisis(CATALOGO)
+SNAPSHOT_ANALISIS.obtener()
+
+# Caché de resultados por pHash de la imagen subida (se vacía si cambia el índice)
+CACHE_CONSULTAS = CacheConsultas(max_entradas=1024, ttl=3600)
+
+# Segundos entre revisiones automáticas de data/ (0 = solo con /admin/recargar)
+INTERVALO_RECARGA = int(os.environ.get("INTERVALO_RECARGA", "30"))
+
+# Token para /admin/recargar; si no se define, solo se acepta desde la misma máquina
+TOKEN_ADMIN = os.environ.get("TOKEN_ADMIN")
+
+# Tamaño máximo de la imagen subida (Flask responde 413 si se supera)
+MAX_TAMANO_SUBIDA = 10 * 1024 * 1024
+
+# Tamaño máximo total de un pedido a la API de búsqueda en lote
+MAX_TAMANO_LOTE = 500 * 1024 * 1024
+
+# Máximo de resultados por imagen que se pueden pedir a la API
+MAX_TOPN_API = 50
+
+# Tamaño de la vista previa que se muestra en la página (se escala por CSS a 260px)
+TAMANO_VISTA_PREVIA = (520, 520)
 
 # Instanciamos la app Flask
 app = Flask(__name__)
+app.config["MAX_CONTENT_LENGTH"] = MAX_TAMANO_SUBIDA
+
+
+# ================================
+#     MANEJO DE LA IMAGEN SUBIDA
+# ================================
+def leer_imagen_subida(archivo):
+    """
+    Lee la imagen subida directamente en memoria (sin guardarla en disco).
+    Devuelve (contenido_en_bytes, None) o (None, mensaje_de_error).
+
+    No se mira el tipo declarado (curl y muchas apps mandan las imágenes
+    como application/octet-stream): decide Pillow, más abajo.
+    """
+    contenido = archivo.read(MAX_TAMANO_SUBIDA + 1)
+    if not contenido:
+        return None, "El archivo subido está vacío."
+    if len(contenido) > MAX_TAMANO_SUBIDA:
+        return None, "La imagen es demasiado grande."
+
+    # Pillow solo lee la cabecera: alcanza para saber si es una imagen válida
+    try:
+        Image.open(BytesIO(contenido))
+    except Exception:
+        return None, "No se pudo leer la imagen."
+
+    return contenido, None
+
+
+def vista_previa_data_uri(contenido):
+    """
+    Genera una miniatura JPEG de la imagen y la devuelve como data URI,
+    así la vista previa se muestra sin escribir archivos compartidos entre requests.
+    """
+    try:
+        img = Image.open(BytesIO(contenido))
+        img.draft("RGB", TAMANO_VISTA_PREVIA)
+        img = img.convert("RGB")
+        img.thumbnail(TAMANO_VISTA_PREVIA)
+
+        buffer = BytesIO()
+        img.save(buffer, format="JPEG", quality=85)
+        return "data:image/jpeg;base64," + base64.b64encode(buffer.getvalue()).decode("ascii")
+    except Exception:
+        return None
 
 
 # ================================
@@ -35,6 +114,7 @@ app = Flask(__name__)
 def index():
     resultados = None
     imagen_subida = None
+    error = None
 
     # Si el usuario envió una imagen mediante POST...
     if request.method == "POST":
@@ -42,38 +122,101 @@ def index():
 
         # Validamos que efectivamente exista un archivo
         if archivo:
-            # Ruta donde guardamos la imagen subida por el usuario
-            ruta_local = os.path.join("static", "img", "input.jpg")
-            archivo.save(ruta_local)
-            imagen_subida = ruta_local
-
-            # Ejecutar la búsqueda usando perceptual hash (pHash)
-            resultados_raw = buscar_por_imagen_phash(
-                ruta_local,
-                PRODUCTOS,
-                topn=6,             # cantidad de resultados a traer
-                force_rebuild=False  # evitar recalcular hashes si ya existen
-            )
-
-            # Log para consola: mostramos nombres y precios obtenidos
-            for score, prod in resultados_raw:
-                print(">>", prod.nombre, "precio:", prod.precio, "raw:", getattr(prod, "precio_raw", None))
-
-            # Convertimos los resultados a un diccionario para pasarlos fácilmente al template
-            resultados = [
-                {
-                    "score": round(score, 3),
-                    "nombre": prod.nombre,
-                    "precio": prod.precio,
-                    "marca": prod.marca,
-                    "link": prod.link,
-                    "imagen": prod.imagen,
-                }
-                for score, prod in resultados_raw
-            ]
+            # Leemos la imagen en memoria: cada request trabaja con su propio buffer
+            contenido, error = leer_imagen_subida(archivo)
+
+            if error is None:
+                imagen_subida = vista_previa_data_uri(contenido)
+
+                # Ejecutar la búsqueda usando perceptual hash (pHash)
+                resultados_raw = buscar_por_imagen_phash(
+                    BytesIO(contenido),
+                    CATALOGO.productos,
+                    topn=6,               # cantidad de resultados a traer
+                    indice=INDICE.actual,   # índice ya cargado: no se relee por request
+                    cache=CACHE_CONSULTAS,  # reutiliza resultados de imágenes repetidas
+                    reordenar=True,         # re-ordena con dHash, wHash y color
+                    colapsar_duplicados=True  # una sola tarjeta por imagen repetida
+                )
+
+                # Log para consola: mostramos nombres y precios obtenidos
+                for score, prod in resultados_raw:
+                    print(">>", prod.nombre, "precio:", prod.precio, "raw:", getattr(prod, "precio_raw", None))
+
+                # Convertimos los resultados a un diccionario para pasarlos fácilmente al template
+                resultados = [
+                    {
+                        "score": round(score, 3),
+                        "nombre": prod.nombre,
+                        "precio": prod.precio,
+                        "marca": prod.marca,
+                        "link": prod.link,
+                        "imagen": prod.imagen,
+                    }
+                    for score, prod in resultados_raw
+                ]
 
     # Renderizamos la página principal con los resultados (o vacío si es GET)
-    return render_template("index.html", resultados=resultados, imagen_subida=imagen_subida)
+    return render_template("index.html", resultados=resultados, imagen_subida=imagen_subida, error=error)
+
+
+# ================================
+#     API DE BÚSQUEDA EN LOTE
+# ================================
+@app.route("/api/buscar", methods=["POST"])
+def api_buscar():
+    """
+    Recibe varias imágenes (campo "imagenes" de un form multipart) y devuelve
+    en JSON los productos más parecidos a cada una.
+    Parámetro opcional: topn (por defecto 6).
+    """
+    # Este endpoint acepta lotes grandes, así que subimos el límite solo acá
+    request.max_content_length = MAX_TAMANO_LOTE
+
+    try:
+        topn = min(max(int(request.values.get("topn", 6)), 1), MAX_TOPN_API)
+    except ValueError:
+        return jsonify({"error": "topn debe ser un número entero."}), 400
+
+    archivos = request.files.getlist("imagenes")
+    if not archivos:
+        return jsonify({"error": "No se enviaron imágenes en el campo 'imagenes'."}), 400
+
+    # Validamos cada archivo en memoria y separamos los que se pueden buscar
+    respuesta = []
+    contenidos = []
+    for archivo in archivos:
+        contenido, error = leer_imagen_subida(archivo)
+        respuesta.append({"archivo": archivo.filename, "error": error, "resultados": []})
+        if error is None:
+            contenidos.append((len(respuesta) - 1, contenido))
+
+    # Todas las imágenes válidas se buscan juntas contra el índice residente
+    encontrados = buscar_por_imagenes_phash(
+        [contenido for _, contenido in contenidos],
+        CATALOGO.productos,
+        topn=topn,
+        indice=INDICE.actual
+    )
+
+    for (posicion, _), resultados_raw in zip(contenidos, encontrados):
+        if resultados_raw is None:
+            respuesta[posicion]["error"] = "No se pudo calcular el pHash de la imagen."
+            continue
+
+        respuesta[posicion]["resultados"] = [
+            {
+                "score": round(score, 3),
+                "nombre": prod.nombre,
+                "precio": prod.precio,
+                "marca": prod.marca,
+                "link": prod.link,
+                "imagen": prod.imagen,
+            }
+            for score, prod in resultados_raw
+        ]
+
+    return jsonify({"resultados": respuesta})
 
 
 # ================================
@@ -81,23 +224,76 @@ def index():
 # ================================
 @app.route("/analisis")
 def analisis():
-    # Cálculo de datos estadísticos del catálogo completo
-    conteo_marcas = productos_por_marca(PRODUCTOS)
-    promedios = precio_promedio_por_marca(PRODUCTOS)
-    top_5 = top_5_productos_mas_caros(PRODUCTOS)
+    # Estadísticas del catálogo completo, precalculadas para esta versión de data/
+    panel = SNAPSHOT_ANALISIS.obtener()
+
+    # Grupos de imágenes duplicadas del índice residente (ya están en memoria)
+    indice = INDICE.actual
+    duplicados = indice.grupos if indice is not None else None
 
     # Renderizamos el panel de análisis
     return render_template(
         "analisis.html",
-        conteo_marcas=conteo_marcas,
-        promedios=promedios,
-        top_5=top_5
+        conteo_marcas=panel["conteo_marcas"],
+        promedios=panel["promedios"],
+        top_5=panel["top_5"],
+        minimos=panel["minimo_por_marca"],
+        maximos=panel["maximo_por_marca"],
+        percentiles=panel["percentiles_por_marca"],
+        validacion=panel["validacion"],
+        total_productos=panel["total_productos"],
+        duplicados=duplicados
     )
 
 
+# ================================
+#     REPORTE DE VALIDACIÓN
+# ================================
+@app.route("/api/validacion")
+def api_validacion():
+    # Errores encontrados al cargar data/ (archivo, fila, motivos), sin volver a recorrer el catálogo
+    return jsonify(SNAPSHOT_ANALISIS.obtener()["validacion"])
+
+
+# ================================
+#     ESTADÍSTICAS DE LA CACHÉ
+# ================================
+@app.route("/estadisticas/cache")
+def estadisticas_cache():
+    # Aciertos / fallos de la caché de consultas, para dimensionarla
+    return jsonify(CACHE_CONSULTAS.estadisticas())
+
+
+# ================================
+#     RECARGA DEL CATÁLOGO
+# ================================
+@app.route("/admin/recargar", methods=["POST"])
+def admin_recargar():
+    """
+    Relee los archivos de data/ que cambiaron y actualiza el catálogo y el
+    índice de imágenes sin reiniciar el servidor.
+
+    Con ?revalidar=1 además pide de forma condicional (ETag / Last-Modified)
+    todas las imágenes ya indexadas y re-hashea las que cambiaron.
+    """
+    if TOKEN_ADMIN:
+        if request.headers.get("X-Token-Admin") != TOKEN_ADMIN:
+            return jsonify({"error": "Token inválido."}), 403
+    elif request.remote_addr not in ("127.0.0.1", "::1"):
+        return jsonify({"error": "Solo disponible desde la misma máquina."}), 403
+
+    cambios = CATALOGO.recargar(revalidar=request.args.get("revalidar") == "1")
+    cambios["productos"] = len(CATALOGO.productos)
+    return jsonify(cambios)
+
+
 # ================================
 #     EJECUCIÓN DEL SERVIDOR
 # ================================
 if __name__ == "__main__":
+    # Revisamos data/ en segundo plano para tomar los scrapes nuevos sin reiniciar
+    if INTERVALO_RECARGA > 0:
+        CATALOGO.iniciar_vigilancia(INTERVALO_RECARGA)
+
     # host="0.0.0.0" permite acceder desde otras máquinas en la red (útil para demos)
     app.run(debug=True, host="0.0.0.0", port=8080)
@@ -0,0 +1,97 @@
+"""
+benchmark_memoria.py
+
+Compara la memoria que ocupa el catálogo con la representación anterior
+de Producto (objeto con __dict__ y una copia de la marca por instancia)
+y con la actual (producto.py: __slots__ y marca internada).
+
+Para simular un catálogo grande, repite los productos de data/ hasta
+llegar a la cantidad pedida. Cada producto se decodifica de su propio
+JSON, como pasa al cargar archivos reales, así cada uno trae sus propios
+strings.
+
+Uso:
+    python benchmark_memoria.py [cantidad_de_productos]
+"""
+
+import gc
+import json
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cargar_productos import iterar_items_archivo, normalizar_precio, clase_segun_marca
+
+CANTIDAD_POR_DEFECTO = 200_000
+
+
+class ProductoConDict:
+    """Representación anterior de Producto: atributos en __dict__, sin internar."""
+
+    def __init__(self, nombre, precio, link, imagen, marca):
+        self.nombre = nombre
+        self.precio = precio
+        self.link = link
+        self.imagen = imagen
+        self.marca = marca
+
+
+def _items_json(carpeta_data, cantidad):
+    """Devuelve `cantidad` productos crudos, cada uno decodificado de su propio JSON."""
+    textos = []
+    for archivo in sorted(os.listdir(carpeta_data)):
+        if archivo.endswith(".json") or archivo.endswith(".jsonl"):
+            for item in iterar_items_archivo(os.path.join(carpeta_data, archivo)):
+                textos.append(json.dumps(item, ensure_ascii=False))
+
+    for i in range(cantidad):
+        yield json.loads(textos[i % len(textos)])
+
+
+def medir(crear, carpeta_data, cantidad):
+    """Crea `cantidad` productos con `crear(item)` y devuelve los bytes que quedan ocupados."""
+    gc.collect()
+    tracemalloc.start()
+    productos = [crear(item) for item in _items_json(carpeta_data, cantidad)]
+    gc.collect()
+    usado, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del productos
+    return usado
+
+
+def _crear_con_dict(item):
+    return ProductoConDict(
+        nombre=item.get("nombre", "Sin nombre"),
+        precio=normalizar_precio(item.get("precio", 0)),
+        link=item.get("link") or item.get("url", ""),
+        imagen=item.get("imagen", ""),
+        marca=item.get("marca", "Desconocida"),
+    )
+
+
+def _crear_con_slots(item):
+    marca = item.get("marca", "Desconocida")
+    return clase_segun_marca(marca)(
+        nombre=item.get("nombre", "Sin nombre"),
+        precio=normalizar_precio(item.get("precio", 0)),
+        link=item.get("link") or item.get("url", ""),
+        imagen=item.get("imagen", ""),
+        marca=marca,
+    )
+
+
+if __name__ == "__main__":
+    carpeta = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+    cantidad = int(sys.argv[1]) if len(sys.argv) > 1 else CANTIDAD_POR_DEFECTO
+
+    print(f"📦 Midiendo memoria con {cantidad} productos...")
+    anterior = medir(_crear_con_dict, carpeta, cantidad)
+    actual = medir(_crear_con_slots, carpeta, cantidad)
+
+    mb = 1024 * 1024
+    print(f"   • Con __dict__ (anterior): {anterior / mb:8.1f} MB  ({anterior / cantidad:.0f} bytes/producto)")
+    print(f"   • Con __slots__ (actual):  {actual / mb:8.1f} MB  ({actual / cantidad:.0f} bytes/producto)")
+    print(f"   • Ahorro: {(1 - actual / anterior) * 100:.1f} %")
@@ -0,0 +1,196 @@
+"""
+benchmark_parseo.py
+
+Compara el parseo HTML anterior de los scrapers (árbol completo con
+"html.parser" y select sobre toda la página) con el actual
+(data/parseo_html.py: lxml y solo los nodos de producto).
+
+Para cada tienda mide el tiempo sobre un HTML de listado guardado en
+disco y verifica que los productos obtenidos sean exactamente los mismos.
+
+Si existe data/fixtures/<tienda>.html (por ejemplo, el page_source de un
+listado real guardado) se usa ese archivo. Si no, se arma un listado de
+ejemplo con el marcado de cada tienda a partir de los productos de data/,
+con el "ruido" típico de la página (menú, scripts, íconos), y se guarda
+en una carpeta temporal.
+
+Uso:
+    python benchmark_parseo.py [productos_por_listado]
+"""
+
+import html as html_lib
+import os
+import sys
+import tempfile
+import time
+
+CARPETA = os.path.dirname(os.path.abspath(__file__))
+CARPETA_DATA = os.path.join(CARPETA, "data")
+sys.path.insert(0, CARPETA)
+sys.path.insert(0, CARPETA_DATA)
+
+from cargar_productos import iterar_items_archivo
+from parseo_html import PARSER_ORIGINAL, PARSER_RAPIDO, nodos_producto
+from rotunda_scraper import ScraperRotunda
+from sierramora_scraper import ScraperSierraMora
+from sisi_scraper import extract_links_from_html, parse_product_html
+
+CANTIDAD_POR_DEFECTO = 3000
+REPETICIONES = 3
+CARPETA_FIXTURES = os.path.join(CARPETA_DATA, "fixtures")
+
+
+# ==========================================================
+#                 LISTADOS DE EJEMPLO
+# ==========================================================
+def _items_de_ejemplo(cantidad):
+    """Productos crudos de data/, repetidos hasta llegar a `cantidad`."""
+    items = []
+    for archivo in sorted(os.listdir(CARPETA_DATA)):
+        if archivo.endswith(".json") or archivo.endswith(".jsonl"):
+            items.extend(iterar_items_archivo(os.path.join(CARPETA_DATA, archivo)))
+    return [items[i % len(items)] for i in range(cantidad)]
+
+
+def _ruido():
+    """Cabecera de página con menú, íconos y scripts, como en los listados reales."""
+    menu = "".join(f'<li><a href="/categoria/{i}"><svg viewBox="0 0 10 10"><path d="M0 0h10v10H0z"/></svg>Categoría {i}</a></li>' for i in range(80))
+    script = "<script>window.__estado = {" + ",".join(f'"k{i}": {i}' for i in range(2000)) + "};</script>"
+    return f"<header><nav><ul>{menu}</ul></nav></header>{script}"
+
+
+def _pagina(cuerpo):
+    return f"<!DOCTYPE html><html><head><title>Listado</title></head><body>{_ruido()}<main>{cuerpo}</main>{_ruido()}</body></html>"
+
+
+def _listado_rotunda(items):
+    nodos = []
+    for i, item in enumerate(items):
+        nombre = html_lib.escape(item.get("nombre", ""))
+        nodos.append(
+            f'<div class="it"><div class="img"><a href="/catalogo/p_{i}">'
+            f'<img src="//f.fcdn.app/imgs/icons/new.png"><img src="//f.fcdn.app/imgs/a/800x1200/{i}.jpg"></a></div>'
+            f'<div class="info"><a class="tit" href="/catalogo/p_{i}"><h2>{nombre}</h2></a>'
+            f'<strong class="precio venta"><span class="sim">$</span> <span class="monto">{item.get("precio", "")}</span></strong></div></div>'
+        )
+    return _pagina('<div class="lista">' + "".join(nodos) + "</div>")
+
+
+def _listado_sierramora(items):
+    nodos = []
+    for i, item in enumerate(items):
+        nombre = html_lib.escape(item.get("nombre", ""))
+        nodos.append(
+            f'<div class="it"><div class="cnt"><a class="img" href="/catalogo/p_{i}">'
+            f'<img src="//f.fcdn.app/imgs/b/800x1200/{i}.jpg" loading="lazy"></a>'
+            f'<div class="info"><a class="tit" href="/catalogo/p_{i}"><h2>{nombre}</h2></a>'
+            f'<strong class="precio"><span class="monto">{item.get("precio", "")}</span></strong></div></div></div>'
+        )
+    return _pagina('<div class="lista">' + "".join(nodos) + "</div>")
+
+
+def _listado_sisi(items):
+    nodos = []
+    for i, item in enumerate(items):
+        nombre = html_lib.escape(item.get("nombre", ""))
+        nodos.append(
+            f'<div class="it"><a href="/catalogo/prenda-{i}_{10000 + i}"><img src="/imgs/{i}.jpg"></a>'
+            f'<a href="/catalogo/prenda-{i}_{10000 + i}" class="tit">{nombre}</a>'
+            f'<a href="/favoritos?agregar={i}">♡</a></div>'
+        )
+    return _pagina("".join(nodos))
+
+
+def _pagina_producto_sisi(item, i):
+    nombre = html_lib.escape(item.get("nombre", ""))
+    return _pagina(
+        f'<meta property="og:image" content="//sisi.com.uy/imgs/catalogo/800x1200/{i}.jpg">'
+        f'<h1>{nombre}</h1><strong class="precio venta"><span class="monto">{item.get("precio", "")}</span></strong>'
+        + "".join(f'<img src="/imgs/relacionados/{j}.jpg">' for j in range(40))
+    )
+
+
+def _fixture(nombre, generar):
+    """Devuelve la ruta del HTML guardado de `nombre` (real si existe, si no, generado)."""
+    real = os.path.join(CARPETA_FIXTURES, f"{nombre}.html")
+    if os.path.exists(real):
+        return real, True
+
+    ruta = os.path.join(tempfile.gettempdir(), f"benchmark_parseo_{nombre}.html")
+    with open(ruta, "w", encoding="utf-8") as f:
+        f.write(generar())
+    return ruta, False
+
+
+# ==========================================================
+#                      MEDICIÓN
+# ==========================================================
+def medir(funcion):
+    """Devuelve (mejor tiempo de REPETICIONES corridas, resultado)."""
+    mejor = None
+    for _ in range(REPETICIONES):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        duracion = time.perf_counter() - inicio
+        mejor = duracion if mejor is None else min(mejor, duracion)
+    return mejor, resultado
+
+
+def comparar(nombre, ruta, real, anterior, actual):
+    with open(ruta, "r", encoding="utf-8") as f:
+        html = f.read()
+
+    t_anterior, r_anterior = medir(lambda: anterior(html))
+    t_actual, r_actual = medir(lambda: actual(html))
+
+    origen = "real" if real else "ejemplo"
+    iguales = "✔ mismos productos" if r_anterior == r_actual else "✘ LOS PRODUCTOS DIFIEREN"
+    print(f"🛍  {nombre} ({origen}, {len(html) / 1024 / 1024:.1f} MB, {len(r_actual)} productos)")
+    print(f"   • Anterior ({PARSER_ORIGINAL}, página completa): {t_anterior:6.3f} s")
+    print(f"   • Actual ({PARSER_RAPIDO}, solo productos):     {t_actual:6.3f} s  (x{t_anterior / t_actual:.1f})")
+    print(f"   • {iguales}")
+    return r_anterior == r_actual
+
+
+def _listado(scraper):
+    """Par (anterior, actual) de funciones html → productos para un ScraperBase."""
+    def anterior(html):
+        nodos = nodos_producto(html, scraper.SELECTOR_PRODUCTO, parser=PARSER_ORIGINAL, filtrar=False)
+        return [p for p in map(scraper.parsear, nodos) if p]
+
+    def actual(html):
+        return [p for p in map(scraper.parsear, scraper.iterar_nodos(html)) if p]
+
+    return anterior, actual
+
+
+if __name__ == "__main__":
+    cantidad = int(sys.argv[1]) if len(sys.argv) > 1 else CANTIDAD_POR_DEFECTO
+    items = _items_de_ejemplo(cantidad)
+    print(f"📦 Listados de ejemplo con {cantidad} productos ({REPETICIONES} repeticiones, mejor tiempo)\n")
+
+    casos = [
+        ("rotunda", lambda: _listado_rotunda(items), *_listado(ScraperRotunda())),
+        ("sierramora", lambda: _listado_sierramora(items), *_listado(ScraperSierraMora())),
+        ("sisi", lambda: _listado_sisi(items),
+         lambda html: extract_links_from_html(html, parser=PARSER_ORIGINAL, filtrar=False),
+         extract_links_from_html),
+    ]
+
+    todo_igual = True
+    for nombre, generar, anterior, actual in casos:
+        ruta, real = _fixture(nombre, generar)
+        todo_igual &= comparar(nombre, ruta, real, anterior, actual)
+        print()
+
+    # Páginas de producto de SiSi: se parsean completas, solo cambia el parser
+    paginas = [_pagina_producto_sisi(item, i) for i, item in enumerate(items[:200])]
+    t_anterior, r_anterior = medir(lambda: [parse_product_html(h, "u", parser=PARSER_ORIGINAL) for h in paginas])
+    t_actual, r_actual = medir(lambda: [parse_product_html(h, "u") for h in paginas])
+    print(f"🛍  sisi, {len(paginas)} páginas de producto")
+    print(f"   • Anterior ({PARSER_ORIGINAL}): {t_anterior:6.3f} s")
+    print(f"   • Actual ({PARSER_RAPIDO}):     {t_actual:6.3f} s  (x{t_anterior / t_actual:.1f})")
+    print(f"   • {'✔ mismos productos' if r_anterior == r_actual else '✘ LOS PRODUCTOS DIFIEREN'}")
+    todo_igual &= r_anterior == r_actual
+
+    sys.exit(0 if todo_igual else 1)
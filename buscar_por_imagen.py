@@ -5,8 +5,9 @@ Implementación simple de búsqueda por similitud de imágenes usando perceptual
 La idea es medir qué tan “parecida” es una imagen a otra comparando sus hashes.
 
 Flujo general:
-1. Descarga las imágenes de los productos (si hace falta).
-2. Calcula el pHash de cada imagen y lo guarda en un archivo cacheado en /tmp.
+1. Descarga las imágenes de los productos en paralelo (si hace falta).
+2. Calcula el pHash de cada imagen y lo guarda en un archivo cacheado en /tmp,
+   junto con un índice binario que se abre con memory-mapping (indice_binario.py).
 3. Calcula el pHash de la imagen subida por el usuario.
 4. Compara ambos hashes con distancia de Hamming.
 5. Devuelve los productos más similares.
@@ -15,17 +16,44 @@ Dependencias:
 - pillow (manejo de imágenes)
 - imagehash (cálculo del phash)
 - requests (descarga de imágenes)
+- numpy (comparación vectorizada de hashes)
 """
 
-import os, json, tempfile
+import os, json, tempfile, threading, time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from PIL import Image
 import imagehash
+import numpy as np
 import requests
 from io import BytesIO
 
-# Ruta al archivo donde se guardará la caché de pHashes
+from agrupar_duplicados import cargar_grupos, generar_grupos
+from cargar_productos import clase_segun_marca
+from descargas import DescargadorImagenes
+from indice_binario import CASILLEROS_COLOR, cargar_indice_binario, escribir_indice_binario
+from indice_bktree import obtener_bktree
+
+# Ruta al archivo donde se guardará la caché de pHashes (una entrada por URL)
 CACHE_FILE = os.path.join(tempfile.gettempdir(), "product_image_phashes.json")
 
+# Versión del formato de la caché: si no coincide, se reconstruye desde cero
+CACHE_VERSION = 3
+
+# El pHash reduce la imagen a 32x32: alcanza con decodificar a este tamaño
+TAMANO_DECODIFICACION = (64, 64)
+
+# Histograma de color: niveles por canal RGB (4 → 64 casilleros)
+NIVELES_COLOR = 4
+
+# En la clave de caché cada casillero del histograma se redondea a pasos de
+# este tamaño, así una imagen re-codificada o casi igual cae en la misma clave
+PASO_COLOR_CLAVE = 0.05
+
+# Espera antes de volver a pedir una imagen que falló: se duplica con cada
+# intento fallido (1 min, 2 min, 4 min...) hasta un máximo de 6 horas
+ESPERA_REINTENTO = 60
+ESPERA_REINTENTO_MAX = 6 * 60 * 60
+
 
 # ==========================================================
 #                    DESCARGA DE IMÁGENES
@@ -46,78 +74,386 @@ def descargar_imagen(url, timeout=8):
 # ==========================================================
 #                 PHASH DE IMAGEN LOCAL
 # ==========================================================
+def _abrir_reducida(origen):
+    """
+    Abre una imagen (ruta o buffer) y la devuelve en RGB.
+
+    Con draft() le pedimos a Pillow que decodifique directamente a tamaño
+    reducido (JPEG lo soporta; otros formatos lo ignoran), así no
+    decodificamos 800x1200 píxeles para terminar en 32x32.
+    """
+    img = Image.open(origen)
+    img.draft('RGB', TAMANO_DECODIFICACION)
+    return img.convert('RGB')
+
+
+def _phash_de_archivo(origen):
+    """Abre una imagen (ruta o buffer) y calcula su pHash."""
+    return imagehash.phash(_abrir_reducida(origen))
+
+
 def obtener_phash_de_imagen_local(path):
     """
-    Abre una imagen local, la convierte a RGB y calcula su pHash.
+    Abre una imagen local (ruta o buffer en memoria) y calcula su pHash.
     Devuelve un objeto imagehash.phash o None si falla.
     """
     try:
-        img = Image.open(path).convert('RGB')
-        return imagehash.phash(img)
+        return _phash_de_archivo(path)
+    except Exception:
+        return None
+
+
+def phash_desde_bytes(contenido):
+    """
+    Calcula el pHash de una imagen a partir de sus bytes crudos.
+    Devuelve el hash como string hexadecimal o None si falla.
+    Es una función de módulo para poder ejecutarla en un ProcessPoolExecutor.
+    """
+    try:
+        return str(_phash_de_archivo(BytesIO(contenido)))
     except Exception:
         return None
 
 
 # ==========================================================
-#              CONSTRUCCIÓN DEL ÍNDICE pHASH
+#      DESCRIPTORES ADICIONALES (dHash, wHash, color)
 # ==========================================================
-def build_phash_index(productos, force_rebuild=False):
+def histograma_color(img):
     """
-    Construye un índice que mapea:
-        { phash_string : [lista de productos con ese phash] }
+    Histograma RGB conjunto de NIVELES_COLOR niveles por canal, normalizado
+    para que sume 1. Es lo que distingue variantes de color que el pHash
+    (que trabaja en escala de grises) ve casi iguales.
+    """
+    pixeles = np.asarray(img.resize((32, 32)), dtype=np.uint8) // (256 // NIVELES_COLOR)
+    codigos = (pixeles[..., 0].astype(np.int64) * NIVELES_COLOR + pixeles[..., 1]) * NIVELES_COLOR + pixeles[..., 2]
+    hist = np.bincount(codigos.ravel(), minlength=NIVELES_COLOR ** 3).astype(np.float32)
+    return hist / hist.sum()
+
 
-    - Si ya existe un archivo de caché y no se pide reconstrucción, lo usa.
-    - Si no, descarga imágenes, calcula pHash y genera el índice.
+def clave_descriptores(descriptores):
     """
+    Clave de caché de una consulta con re-ordenamiento: pHash y dHash más
+    el histograma de color cuantizado (dos variantes de color pueden tener
+    los mismos hashes, que trabajan en escala de grises). El wHash queda
+    afuera porque cambia algún bit con solo volver a comprimir el JPEG.
+    """
+    color = ",".join(str(round(v / PASO_COLOR_CLAVE)) for v in descriptores["color"])
+    return f"{descriptores['phash']}:{descriptores['dhash']}:{color}"
 
-    # --- Intentamos usar la caché existente ---
-    if os.path.exists(CACHE_FILE) and not force_rebuild:
-        try:
-            with open(CACHE_FILE, 'r', encoding='utf-8') as f:
-                cache = json.load(f)
-            if isinstance(cache, dict):
-                return cache
-        except Exception:
-            pass  # Si falla, recalculamos desde cero
-
-    # --- Construcción desde cero ---
-    index = {}
-    for p in productos:
-        # Obtenemos la URL de la imagen del producto
-        url = getattr(p, "imagen", "") or ""
-        if not url:
-            continue
 
-        try:
-            img = descargar_imagen(url)
-            if img is None:
-                continue
+def _descriptores_de_archivo(origen):
+    """Calcula pHash, dHash, wHash e histograma de color de una imagen."""
+    img = _abrir_reducida(origen)
+    return {
+        "phash": str(imagehash.phash(img)),
+        "dhash": str(imagehash.dhash(img)),
+        "whash": str(imagehash.whash(img, image_scale=TAMANO_DECODIFICACION[0])),
+        "color": [round(float(x), 5) for x in histograma_color(img)],
+    }
 
-            # Calculamos el pHash y lo guardamos como string hexadecimal
-            ph = str(imagehash.phash(img))
 
-            # Guardamos info relevante del producto en el índice
-            index.setdefault(ph, []).append({
+def obtener_descriptores_de_imagen_local(path):
+    """
+    Igual que obtener_phash_de_imagen_local pero devuelve todos los descriptores:
+        {"phash", "dhash", "whash", "color"}
+    o None si falla.
+    """
+    try:
+        return _descriptores_de_archivo(path)
+    except Exception:
+        return None
+
+
+def descriptores_desde_bytes(contenido):
+    """Descriptores de una imagen en bytes (para el ProcessPoolExecutor), o None si falla."""
+    try:
+        return _descriptores_de_archivo(BytesIO(contenido))
+    except Exception:
+        return None
+
+
+# ==========================================================
+#          CACHÉ INCREMENTAL POR URL DE IMAGEN
+# ==========================================================
+def cargar_entradas(ruta=CACHE_FILE):
+    """
+    Lee la caché de entradas por URL:
+        { url : {"phash", "descriptores", "fecha", "etag", "last_modified", "estado", "intentos", "productos"} }
+    Devuelve {} si no existe o tiene un formato viejo/roto.
+    """
+    try:
+        with open(ruta, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        if isinstance(cache, dict) and cache.get("version") == CACHE_VERSION:
+            return cache.get("entradas", {})
+    except Exception:
+        pass
+    return {}
+
+
+def guardar_entradas(entradas, ruta=CACHE_FILE):
+    """Guarda la caché de entradas por URL. Si falla, seguimos sin caché."""
+    try:
+        with open(ruta, 'w', encoding='utf-8') as f:
+            json.dump({"version": CACHE_VERSION, "entradas": entradas}, f, ensure_ascii=False)
+    except Exception:
+        pass
+
+
+def _productos_por_url(productos):
+    """Agrupa los productos por URL de imagen (varias variantes pueden compartirla)."""
+    por_url = {}
+    for p in productos:
+        # Obtenemos la URL de la imagen del producto
+        url = getattr(p, "imagen", "") or ""
+        if url:
+            por_url.setdefault(url, []).append({
                 "nombre": p.nombre,
                 "precio": p.precio,
                 "marca": p.marca,
                 "link": getattr(p, "link", ""),
                 "imagen": url
             })
+    return por_url
+
 
-        except Exception:
+def _espera_reintento(entrada):
+    """Segundos a esperar desde el último intento fallido de una entrada."""
+    intentos = max(entrada.get("intentos") or 1, 1)
+    return min(ESPERA_REINTENTO * 2 ** (intentos - 1), ESPERA_REINTENTO_MAX)
+
+
+def _toca_reintentar(entrada, ahora):
+    """Una entrada sin hash se vuelve a pedir si nunca se intentó o si ya pasó su espera."""
+    fecha = entrada.get("fecha")
+    return fecha is None or ahora - fecha >= _espera_reintento(entrada)
+
+
+def proximo_reintento(entradas):
+    """Momento (time.time()) en que vence la espera de la próxima entrada fallida, o None."""
+    momentos = [
+        (e.get("fecha") or 0) + _espera_reintento(e)
+        for e in entradas.values() if e.get("estado") != "ok"
+    ]
+    return min(momentos) if momentos else None
+
+
+def sincronizar_indice(productos, entradas=None, revalidar=False, reintentar_fallidas=False, procesos=None):
+    """
+    Actualiza la caché por URL para que refleje exactamente `productos`:
+
+    - URLs nuevas → se descargan y hashean.
+    - URLs que ya no están en el catálogo → se eliminan.
+    - URLs conocidas → solo se actualizan los datos del producto (precio, nombre...).
+    - URLs que fallaron → se vuelven a pedir cuando vence su espera
+      (ESPERA_REINTENTO, duplicada en cada intento fallido).
+    - revalidar=True → las URLs conocidas se piden de forma condicional
+      (ETag / Last-Modified) y solo se re-hashean si el servidor dice que cambiaron.
+      También puede ser un conjunto de URLs: se revalidan solo esas.
+    - reintentar_fallidas=True → se vuelven a pedir las URLs que fallaron sin esperar.
+
+    Así el costo de actualizar es proporcional a lo que cambió del catálogo.
+
+    Devuelve (entradas, cambio_indice, cambio_cache):
+    - cambio_indice: cambió algo que va al índice binario (URLs, productos,
+      hashes o qué entradas están "ok"); hay que reescribirlo.
+    - cambio_cache: solo cambiaron datos de control (fecha, intentos,
+      validadores, errores de entradas sin hash); alcanza con guardar la caché.
+    """
+    if entradas is None:
+        entradas = cargar_entradas()
+
+    por_url = _productos_por_url(productos)
+    cambios = False   # afecta al índice binario
+    anotado = False   # solo datos de control de la caché
+    ahora = time.time()
+
+    # --- Desalojamos URLs que ya no existen en el catálogo ---
+    for url in list(entradas):
+        if url not in por_url:
+            del entradas[url]
+            cambios = True
+
+    # --- Actualizamos datos de producto y decidimos qué hay que pedir ---
+    pendientes = []
+    validadores = {}
+    for url, items in por_url.items():
+        entrada = entradas.get(url)
+        if entrada is None:
+            entradas[url] = {"phash": None, "descriptores": None, "fecha": None, "etag": None,
+                             "last_modified": None, "estado": "pendiente", "intentos": 0, "productos": items}
+            pendientes.append(url)
+            cambios = True
             continue
 
-    # --- Guardar caché en /tmp ---
-    try:
-        with open(CACHE_FILE, 'w', encoding='utf-8') as f:
-            json.dump(index, f, ensure_ascii=False, indent=2)
-    except Exception:
-        pass
+        if entrada.get("productos") != items:
+            entrada["productos"] = items
+            cambios = True
 
+        if entrada.get("estado") != "ok":
+            if reintentar_fallidas or _toca_reintentar(entrada, ahora):
+                pendientes.append(url)
+        elif revalidar is True or (revalidar and url in revalidar):
+            pendientes.append(url)
+            validadores[url] = (entrada.get("etag"), entrada.get("last_modified"))
+
+    if not pendientes:
+        return entradas, cambios, anotado
+
+    # --- Descargamos (en hilos) y hasheamos (en procesos) solo lo pendiente ---
+    descargador = DescargadorImagenes()
+    try:
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            futuros = {}
+            for respuesta in descargador.descargar_todas(pendientes, validadores):
+                entrada = entradas[respuesta.url]
+                entrada["fecha"] = time.time()
+                anotado = True
+
+                if respuesta.estado == 304:
+                    continue  # la imagen no cambió: conservamos el hash
+
+                if respuesta.contenido is None:
+                    # Si falla una revalidación se conserva el hash que ya teníamos
+                    if entrada.get("estado") != "ok":
+                        entrada["estado"] = "error"
+                        entrada["intentos"] = (entrada.get("intentos") or 0) + 1
+                    continue
+
+                entrada["etag"] = respuesta.etag
+                entrada["last_modified"] = respuesta.last_modified
+                futuros[pool.submit(descriptores_desde_bytes, respuesta.contenido)] = respuesta.url
+
+            for futuro in as_completed(futuros):
+                entrada = entradas[futuros[futuro]]
+                descriptores = futuro.result()
+                if descriptores is None:
+                    cambios = cambios or entrada.get("estado") == "ok"
+                    entrada["estado"] = "error"
+                    entrada["intentos"] = (entrada.get("intentos") or 0) + 1
+                    continue
+
+                phash = descriptores.pop("phash")
+                if (entrada.get("estado") != "ok" or entrada.get("phash") != phash
+                        or entrada.get("descriptores") != descriptores):
+                    cambios = True  # imagen nueva o que cambió en la misma URL
+                entrada["phash"] = phash
+                entrada["descriptores"] = descriptores
+                entrada["estado"] = "ok"
+                entrada["intentos"] = 0
+    finally:
+        descargador.cerrar()
+
+    return entradas, cambios, anotado
+
+
+def indice_desde_entradas(entradas):
+    """Arma el índice { phash_string : [productos] } a partir de las entradas por URL."""
+    index = {}
+    for entrada in entradas.values():
+        ph = entrada.get("phash")
+        if entrada.get("estado") == "ok" and ph:
+            index.setdefault(ph, []).extend(entrada.get("productos", []))
     return index
 
 
+def arreglos_desde_entradas(entradas):
+    """
+    Arma los arreglos del índice binario a partir de las entradas por URL:
+    una fila por producto con su pHash, dHash, wHash e histograma de color.
+    Devuelve un diccionario listo para escribir_indice_binario(**arreglos).
+    """
+    hashes, dhash, whash, color, productos = [], [], [], [], []
+    for entrada in entradas.values():
+        ph = entrada.get("phash")
+        if entrada.get("estado") != "ok" or not ph:
+            continue
+
+        descriptores = entrada.get("descriptores") or {}
+        for item in entrada.get("productos", []):
+            hashes.append(int(ph, 16))
+            dhash.append(int(descriptores.get("dhash", "0"), 16))
+            whash.append(int(descriptores.get("whash", "0"), 16))
+            color.append(descriptores.get("color") or [0.0] * CASILLEROS_COLOR)
+            productos.append(item)
+
+    return {
+        "hashes": np.array(hashes, dtype=np.uint64),
+        "productos": productos,
+        "dhash": np.array(dhash, dtype=np.uint64),
+        "whash": np.array(whash, dtype=np.uint64),
+        "color": np.array(color, dtype=np.float32).reshape(len(productos), CASILLEROS_COLOR),
+    }
+
+
+# ==========================================================
+#              CONSTRUCCIÓN DEL ÍNDICE pHASH
+# ==========================================================
+def actualizar_cache(productos, force_rebuild=False, revalidar=False, procesos=None):
+    """
+    Sincroniza la caché por URL con `productos` (ver sincronizar_indice).
+    Si cambió algo del índice, guarda la caché y reescribe el índice
+    binario (nueva generación); si solo cambiaron datos de control (fecha
+    de un reintento fallido, una revalidación con 304) guarda la caché y
+    deja el binario como está.
+    Devuelve las entradas por URL.
+
+    Si no se puede escribir el binario, se avisa y se propaga el error sin
+    guardar la caché: así la próxima sincronización lo vuelve a intentar
+    en lugar de dar por bueno un binario de otro catálogo.
+    """
+    entradas = {} if force_rebuild else cargar_entradas()
+    entradas, cambios, anotado = sincronizar_indice(productos, entradas, revalidar=revalidar, procesos=procesos)
+
+    if cambios or force_rebuild or cargar_indice_binario() is None:
+        # --- Índice binario (memmap), listo para las consultas ---
+        try:
+            escribir_indice_binario(**arreglos_desde_entradas(entradas))
+        except Exception as e:
+            print(f"⚠ No se pudo escribir el índice binario: {e}")
+            raise
+
+        # --- Guardar caché en /tmp (recién con el binario al día) ---
+        guardar_entradas(entradas)
+    elif anotado:
+        guardar_entradas(entradas)
+
+    return entradas
+
+
+def build_phash_index(productos, force_rebuild=False, procesos=None, revalidar=False):
+    """
+    Construye un índice que mapea:
+        { phash_string : [lista de productos con ese phash] }
+
+    - Usa la caché por URL y solo descarga las imágenes nuevas del catálogo
+      (ver sincronizar_indice); las que ya no están se eliminan y las que
+      fallaron se reintentan cuando vence su espera.
+    - revalidar: True (o un conjunto de URLs) para pedir de forma
+      condicional las imágenes conocidas y detectar las que cambiaron.
+    - Con force_rebuild=True descarta la caché y vuelve a bajar todo.
+    - La descarga corre en hilos y el hashing (CPU) en `procesos` procesos
+      (por defecto, uno por núcleo).
+    """
+    entradas = actualizar_cache(productos, force_rebuild=force_rebuild, revalidar=revalidar, procesos=procesos)
+    return indice_desde_entradas(entradas)
+
+
+def obtener_indice(productos, force_rebuild=False, procesos=None):
+    """
+    Devuelve el IndiceBinario para buscar.
+
+    Si se pasan `productos`, primero se sincroniza la caché con ellos
+    (build_phash_index solo descarga la diferencia) y recién después se
+    abre el binario con memory-mapping; así un índice que quedó de un
+    catálogo anterior nunca se sirve tal cual. Con productos=None se abre
+    el binario que haya en disco.
+    """
+    if productos is not None:
+        build_phash_index(productos, force_rebuild=force_rebuild, procesos=procesos)
+    return cargar_indice_binario()
+
+
 # ==========================================================
 #             DISTANCIA DE HAMMING ENTRE HASHES
 # ==========================================================
@@ -140,65 +476,435 @@ def hamming_distance(hash1, hash2):
         return 999  # valor grande = muy diferente
 
 
+# ==========================================================
+#          DISTANCIAS SOBRE EL ARREGLO DE HASHES
+# ==========================================================
+def distancias_hamming(hash_consulta, hashes):
+    """
+    Calcula la distancia de Hamming entre un hash y todo el arreglo `hashes`.
+    XOR marca los bits distintos y bitwise_count los cuenta (popcount).
+    """
+    consulta = np.uint64(int(str(hash_consulta), 16))
+    return np.bitwise_count(np.bitwise_xor(hashes, consulta))
+
+
+def top_n_indices(distancias, topn):
+    """
+    Devuelve los índices de las `topn` distancias más chicas, ordenados.
+    argpartition evita ordenar el catálogo entero para quedarnos con pocos.
+    """
+    total = len(distancias)
+    if topn <= 0 or total == 0:
+        return np.array([], dtype=np.int64)
+
+    if topn >= total:
+        return np.argsort(distancias, kind="stable")
+
+    candidatos = np.argpartition(distancias, topn - 1)[:topn]
+    return candidatos[np.argsort(distancias[candidatos], kind="stable")]
+
+
+def top_n_indices_matriz(distancias, topn):
+    """
+    Igual que top_n_indices pero para una matriz (consultas × catálogo):
+    devuelve, por fila, los índices de las `topn` distancias más chicas ordenados.
+    """
+    consultas, total = distancias.shape
+    topn = min(topn, total)
+    if topn <= 0:
+        return np.empty((consultas, 0), dtype=np.int64)
+
+    if topn < total:
+        candidatos = np.argpartition(distancias, topn - 1, axis=1)[:, :topn]
+    else:
+        candidatos = np.broadcast_to(np.arange(total), (consultas, total))
+
+    orden = np.argsort(np.take_along_axis(distancias, candidatos, axis=1), axis=1, kind="stable")
+    return np.take_along_axis(candidatos, orden, axis=1)
+
+
+# ==========================================================
+#            SELECCIÓN DE CANDIDATOS (lineal / BK-tree)
+# ==========================================================
+def _filas_lineal(indice, ph_query, cantidad):
+    """Devuelve [(distancia, fila)] de las `cantidad` filas más cercanas, vectorizado."""
+    distancias = distancias_hamming(ph_query, indice.hashes)
+    return [(int(distancias[i]), int(i)) for i in top_n_indices(distancias, cantidad)]
+
+
+def _filas_bktree(arbol, ph_query, cantidad):
+    """
+    Devuelve [(distancia, fila)] de las `cantidad` filas más cercanas usando el BK-tree.
+    Pedimos `cantidad` hashes: como cada hash tiene al menos una fila,
+    alcanza para completar el pedido.
+    """
+    encontradas = []
+    for dist, filas in arbol.buscar_knn(ph_query, cantidad):
+        for fila in filas:
+            encontradas.append((dist, fila))
+            if len(encontradas) >= cantidad:
+                return encontradas
+    return encontradas
+
+
+# ==========================================================
+#        RE-RANKING CON DESCRIPTORES (segunda etapa)
+# ==========================================================
+# Peso de cada descriptor en la distancia combinada (suman 1)
+PESOS_DESCRIPTORES = {"phash": 0.35, "dhash": 0.2, "whash": 0.15, "color": 0.3}
+
+# Por cada resultado pedido se re-ordenan estos candidatos de la etapa pHash
+CANDIDATOS_POR_RESULTADO = 8
+
+
+def reordenar_candidatos(indice, filas, descriptores, topn):
+    """
+    Segunda etapa de la búsqueda: toma las filas candidatas que devolvió el
+    pHash y las re-ordena con una distancia combinada entre 0 y 1:
+        - pHash / dHash / wHash → distancia de Hamming / 64
+        - color → 1 - intersección de histogramas
+
+    Devuelve [(distancia, fila)] con la distancia escalada a 0..64 para que
+    el puntaje final se normalice igual que con el pHash solo.
+    """
+    if not filas:
+        return []
+
+    filas = np.asarray(filas, dtype=np.int64)
+
+    def _hamming(hex_consulta, hashes):
+        return distancias_hamming(hex_consulta, hashes[filas]) / 64
+
+    distancia = (
+        PESOS_DESCRIPTORES["phash"] * _hamming(descriptores["phash"], indice.hashes)
+        + PESOS_DESCRIPTORES["dhash"] * _hamming(descriptores["dhash"], indice.dhash)
+        + PESOS_DESCRIPTORES["whash"] * _hamming(descriptores["whash"], indice.whash)
+    )
+
+    color_consulta = np.asarray(descriptores["color"], dtype=np.float32)
+    interseccion = np.minimum(indice.color[filas], color_consulta).sum(axis=1)
+    distancia = distancia + PESOS_DESCRIPTORES["color"] * (1 - interseccion)
+
+    orden = top_n_indices(distancia, topn)
+    return [(float(distancia[i]) * 64, int(filas[i])) for i in orden]
+
+
+def producto_desde_dict(d):
+    """
+    Convierte un producto del índice (diccionario) en la subclase de
+    Producto que corresponde a su marca (ver producto.py).
+    """
+    marca = d.get('marca')
+    ClaseProd = clase_segun_marca(marca)
+    return ClaseProd(
+        nombre=d.get('nombre'),
+        precio=d.get('precio'),
+        link=d.get('link'),
+        imagen=d.get('imagen'),
+        marca=marca
+    )
+
+
+# ==========================================================
+#          ÍNDICE RESIDENTE EN MEMORIA (para Flask)
+# ==========================================================
+class IndiceBusqueda:
+    """
+    Índice listo para consultar: el IndiceBinario (memmap), su BK-tree
+    (se arma en la primera búsqueda con metodo="bktree") y, si existen, los
+    grupos de imágenes duplicadas (agrupar_duplicados.py). Fuera del
+    BK-tree no se modifica una vez creado; para actualizar se arma uno nuevo.
+    """
+
+    def __init__(self, binario, arbol=None, grupos=None):
+        self.binario = binario
+        self.arbol = arbol
+        self.grupos = grupos
+        self.etiquetas = np.asarray(grupos["etiquetas"]) if grupos else None
+
+    @property
+    def version(self):
+        """Generación del índice binario del que proviene."""
+        return self.binario.generacion
+
+    def __len__(self):
+        return len(self.binario)
+
+    def _sin_duplicados(self, filas):
+        """Deja solo la primera fila de cada grupo de imágenes casi iguales."""
+        vistos = set()
+        unicas = []
+        for dist, fila in filas:
+            grupo = int(self.etiquetas[fila])
+            if grupo not in vistos:
+                vistos.add(grupo)
+                unicas.append((dist, fila))
+        return unicas
+
+    def buscar(self, ph_query, topn=5, metodo="lineal", descriptores=None, colapsar=False):
+        """
+        Devuelve [(distancia, producto_dict)] de los topn más cercanos.
+
+        Si se pasan `descriptores` (ver obtener_descriptores_de_imagen_local),
+        el pHash solo trae candidatos y el orden final lo deciden todos los
+        descriptores juntos (reordenar_candidatos).
+
+        Con colapsar=True se muestra un solo producto por grupo de imágenes
+        duplicadas (si los grupos están generados para este índice).
+        """
+        colapsar = colapsar and self.etiquetas is not None
+        cantidad = topn * CANDIDATOS_POR_RESULTADO if (descriptores or colapsar) else topn
+
+        if metodo == "bktree":
+            if self.arbol is None:
+                self.arbol = obtener_bktree(self.binario)
+            filas = _filas_bktree(self.arbol, ph_query, cantidad)
+        else:
+            filas = _filas_lineal(self.binario, ph_query, cantidad)
+
+        if descriptores:
+            filas = reordenar_candidatos(self.binario, [f for _, f in filas], descriptores, len(filas))
+
+        if colapsar:
+            filas = self._sin_duplicados(filas)
+
+        return [(dist, self.binario.producto(fila)) for dist, fila in filas[:topn]]
+
+
+class IndiceResidente:
+    """
+    Mantiene un IndiceBusqueda vivo durante toda la vida del proceso.
+
+    Las consultas leen `actual` una sola vez y trabajan con esa referencia;
+    refrescar() arma el índice nuevo por completo (con sus grupos de
+    duplicados; el BK-tree se arma recién en la primera consulta que lo
+    use) y recién al final cambia la referencia
+    (asignación atómica), así ninguna consulta ve un índice a medio
+    construir y las que estaban en curso siguen con el anterior.
+    """
+
+    def __init__(self, productos=None):
+        self.productos = productos
+        self._actual = None
+        self.proximo_reintento = None  # cuándo vence la espera de la próxima imagen fallida
+        self._lock = threading.Lock()  # una sola reconstrucción a la vez
+
+        if productos is not None:
+            self.refrescar()
+
+    @property
+    def actual(self):
+        return self._actual
+
+    def reintento_vencido(self):
+        """True si hay imágenes fallidas cuya espera ya venció (ver sincronizar_indice)."""
+        return self.proximo_reintento is not None and time.time() >= self.proximo_reintento
+
+    def refrescar(self, productos=None, force_rebuild=False, revalidar=False):
+        """
+        Sincroniza la caché con el catálogo, reconstruye el índice y lo
+        intercambia por el actual.
+
+        - productos: nuevo catálogo (por defecto, el último usado). Solo se
+          descarga lo nuevo y se reintenta lo que falló; recién después se
+          abre el binario, así nunca se sirve un índice de otro catálogo.
+        - revalidar: True (o un conjunto de URLs) para pedir de forma
+          condicional las imágenes conocidas.
+        - force_rebuild=True: descarta la caché y vuelve a bajar todo.
+
+        Si falla la escritura del binario se propaga el error y se sigue
+        sirviendo el índice actual, con el catálogo anterior.
+        """
+        with self._lock:
+            if productos is None:
+                productos = self.productos
+
+            entradas = actualizar_cache(productos, force_rebuild=force_rebuild, revalidar=revalidar)
+            self.productos = productos
+            self.proximo_reintento = proximo_reintento(entradas)
+            binario = cargar_indice_binario()
+
+            if binario is None:
+                return self._actual
+
+            # El BK-tree lo arma la primera consulta con metodo="bktree"; si el
+            # binario no cambió, se reutiliza el que ya tenía el índice anterior
+            anterior = self._actual
+            arbol = anterior.arbol if anterior is not None and anterior.version == binario.generacion else None
+
+            # Cada binario nuevo tiene otra generación: los grupos de duplicados
+            # se regeneran acá para que la búsqueda y el panel no los pierdan
+            grupos = cargar_grupos(binario.generacion)
+            if grupos is None and len(binario):
+                grupos = generar_grupos(binario)
+
+            nuevo = IndiceBusqueda(binario, arbol, grupos)
+            self._actual = nuevo
+            return nuevo
+
+
 # ==========================================================
 #              BÚSQUEDA PRINCIPAL POR pHASH
 # ==========================================================
-def buscar_por_imagen_phash(ruta_imagen, productos, topn=5, force_rebuild=False):
+def buscar_por_imagen_phash(ruta_imagen, productos, topn=5, force_rebuild=False, metodo="lineal", indice=None,
+                            cache=None, reordenar=False, colapsar_duplicados=False):
     """
     Devuelve lista de (score, producto_obj) ordenada del más similar al menos similar.
 
+    ruta_imagen:
+        Ruta a la imagen de consulta o un buffer en memoria (BytesIO).
+
+    indice:
+        IndiceBusqueda ya cargado (por ejemplo IndiceResidente.actual en app.py).
+        Si no se pasa, se abre o reconstruye en cada llamada.
+
+    cache:
+        CacheConsultas opcional (cache_consultas.py) para reutilizar resultados
+        de consultas con el mismo pHash contra la misma versión del índice.
+
+    metodo:
+        "lineal" → compara contra todo el catálogo en una pasada vectorizada.
+        "bktree" → usa el BK-tree (indice_bktree.py) y poda la mayor parte del catálogo.
+
+    reordenar:
+        Si es True, el pHash solo elige candidatos y el orden final se decide
+        con dHash, wHash e histograma de color (distingue variantes de color).
+
+    colapsar_duplicados:
+        Si es True, muestra un solo producto por grupo de imágenes casi iguales
+        (requiere haber corrido agrupar_duplicados.py sobre el índice actual).
+
     Score normalizado:
         score = 1 - (distancia / 64)
         → 1 = idéntico
         → 0 = completamente diferente
     """
 
-    # Cargamos o reconstruimos el índice
-    index = build_phash_index(productos, force_rebuild=force_rebuild)
-    if not index:
+    # Usamos el índice residente o lo abrimos (memmap) / reconstruimos
+    if indice is None:
+        binario = obtener_indice(productos, force_rebuild=force_rebuild)
+        indice = IndiceBusqueda(binario) if binario is not None else None
+    if not indice:
         print("No hay imágenes indexadas. Asegurate de tener conexión y que los productos tengan URLs de imagen.")
         return []
 
-    # Calculamos el pHash de la imagen del usuario
-    ph_query = obtener_phash_de_imagen_local(ruta_imagen)
+    # Calculamos el pHash (y los demás descriptores si hay que re-ordenar) de la imagen del usuario
+    descriptores = None
+    if reordenar:
+        descriptores = obtener_descriptores_de_imagen_local(ruta_imagen)
+        ph_query = descriptores["phash"] if descriptores else None
+    else:
+        ph_query = obtener_phash_de_imagen_local(ruta_imagen)
+
     if ph_query is None:
         print("No se pudo calcular phash de la imagen de consulta.")
         return []
 
-    results = []
+    # Con re-ordenamiento la clave de caché suma los otros hashes y el color
+    # cuantizado: dos variantes de color pueden tener el mismo pHash
+    clave_metodo = metodo + ("+reordenar" if reordenar else "") + ("+colapsar" if colapsar_duplicados else "")
+    clave_consulta = clave_descriptores(descriptores) if descriptores else ph_query
 
-    # Comparamos contra cada hash del índice
-    for ph, items in index.items():
+    encontrados = None
+    if cache is not None:
+        encontrados = cache.obtener(indice.version, clave_consulta, topn, clave_metodo)
 
-        # Distancia de Hamming entre ambas imágenes
-        dist = hamming_distance(str(ph_query), ph)
+    if encontrados is None:
+        encontrados = indice.buscar(ph_query, topn, metodo, descriptores, colapsar_duplicados)
+        if cache is not None:
+            cache.guardar(indice.version, clave_consulta, topn, clave_metodo, encontrados)
 
-        # Convertimos diccionarios a objetos simples (para mantener uniformidad)
-        for it in items:
-            class P:
-                """Clase interna simple que representa un producto indexado."""
-                def __init__(self, d):
-                    self.nombre = d.get('nombre')
-                    self.precio = d.get('precio')
-                    self.marca = d.get('marca')
-                    self.link = d.get('link')
-                    self.imagen = d.get('imagen')
+    # Solo los N más cercanos se convierten en objetos Producto
+    results = [(dist, producto_desde_dict(item)) for dist, item in encontrados]
 
-                def mostrar_info(self):
-                    return f"{self.nombre} - ${self.precio} - {self.marca}"
+    # Normalizamos puntajes (64 bits en un phash estándar)
+    normalized = [(1 - (dist / 64), prod) for dist, prod in results]
 
-            results.append((dist, P(it)))
+    return normalized
 
-    # Ordenamos por menor distancia (mayor similitud)
-    results.sort(key=lambda x: x[0])
 
-    # Normalizamos puntajes y devolvemos solo los top N
-    normalized = [
-        (1 - (r[0] / 64), r[1])  # 64 bits en un phash estándar
-        for r in results[:topn]
-    ]
+# ==========================================================
+#          BÚSQUEDA EN LOTE (muchas imágenes a la vez)
+# ==========================================================
+# Tope de celdas (consultas × catálogo) que se comparan de una vez, para acotar memoria
+CELDAS_POR_BLOQUE = 1 << 24
 
-    return normalized
+# Hasta esta cantidad de imágenes por lote se hashean en el mismo hilo
+# (repartir unas pocas imágenes cuesta más que hashearlas)
+LOTE_EN_LINEA = 8
+
+_pool_consultas = None
+_pool_consultas_lock = threading.Lock()
+
+
+def _obtener_pool_consultas(hilos=None):
+    """
+    Pool de hilos compartido por todas las búsquedas en lote: se crea la
+    primera vez que se necesita y se reutiliza. Son hilos y no procesos:
+    Pillow suelta el GIL al decodificar y reducir la imagen (lo caro del
+    pHash), y no hay que forkear el servidor Flask con sus hilos, locks y
+    sesiones HTTP vivas (ni re-importar app.py en procesos nuevos).
+    """
+    global _pool_consultas
+    with _pool_consultas_lock:
+        if _pool_consultas is None:
+            _pool_consultas = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="phash-consultas")
+        return _pool_consultas
+
+
+def _hashes_de_consultas(imagenes, hilos=None):
+    """pHash de cada imagen del lote (None si no se pudo leer); en el pool si el lote es grande."""
+    if len(imagenes) > LOTE_EN_LINEA:
+        return list(_obtener_pool_consultas(hilos).map(phash_desde_bytes, imagenes))
+    return [phash_desde_bytes(img) for img in imagenes]
+
+
+def buscar_por_imagenes_phash(imagenes, productos, topn=5, force_rebuild=False, indice=None, hilos=None):
+    """
+    Versión en lote de buscar_por_imagen_phash.
+
+    - imagenes: lista de imágenes en bytes.
+    - Los pHash se calculan en el mismo hilo si el lote es chico
+      (LOTE_EN_LINEA) o en un pool de hilos compartido si es grande.
+    - Todas las consultas se comparan contra el catálogo como una sola
+      operación de matrices (consultas × catálogo con XOR + popcount),
+      procesada en bloques para no disparar el uso de memoria.
+
+    Devuelve una lista alineada con `imagenes`: para cada una, la lista de
+    (score, producto_obj); o None si esa imagen no se pudo leer.
+    """
+    if indice is None:
+        binario = obtener_indice(productos, force_rebuild=force_rebuild)
+        indice = IndiceBusqueda(binario) if binario is not None else None
+    if not indice:
+        print("No hay imágenes indexadas. Asegurate de tener conexión y que los productos tengan URLs de imagen.")
+        return [[] for _ in imagenes]
+
+    # --- pHash de todas las consultas (en paralelo si son muchas) ---
+    hashes_consulta = _hashes_de_consultas(imagenes, hilos)
+
+    validas = [i for i, ph in enumerate(hashes_consulta) if ph is not None]
+    resultados = [None] * len(imagenes)
+    if not validas:
+        return resultados
+
+    consultas = np.array([int(hashes_consulta[i], 16) for i in validas], dtype=np.uint64)
+    catalogo = indice.binario.hashes
+    bloque = max(1, CELDAS_POR_BLOQUE // max(1, len(catalogo)))
+
+    # --- Matriz de distancias por bloques de consultas ---
+    for inicio in range(0, len(consultas), bloque):
+        parte = consultas[inicio:inicio + bloque]
+        distancias = np.bitwise_count(np.bitwise_xor(parte[:, None], catalogo[None, :]))
+        mejores = top_n_indices_matriz(distancias, topn)
+
+        for fila, columnas in enumerate(mejores):
+            resultados[validas[inicio + fila]] = [
+                (1 - (int(distancias[fila, c]) / 64), producto_desde_dict(indice.binario.producto(c)))
+                for c in columnas
+            ]
+
+    return resultados
 
 
 # ==========================================================
@@ -0,0 +1,94 @@
+"""
+cache_consultas.py
+
+Caché de resultados de búsqueda por imagen.
+
+Muchos usuarios suben la misma foto (o una casi idéntica, que da el mismo
+pHash) varias veces. En lugar de volver a recorrer el índice, guardamos
+los top-N ya calculados con una política LRU (se descartan los menos
+usados) y un tiempo de vida (TTL).
+
+La clave incluye la versión del índice: cuando el índice residente se
+reemplaza, la caché se vacía sola para no devolver resultados viejos.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheConsultas:
+    """
+    Caché LRU + TTL de resultados de búsqueda.
+
+    - max_entradas: cantidad máxima de consultas guardadas.
+    - ttl: segundos que vive cada resultado (None = sin vencimiento).
+    """
+
+    def __init__(self, max_entradas=1024, ttl=3600):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+
+        self.aciertos = 0
+        self.fallos = 0
+
+        self._datos = OrderedDict()   # clave → (momento_guardado, resultados)
+        self._version = None
+        self._lock = threading.Lock()
+
+    def _verificar_version(self, version):
+        """Vacía la caché si el índice cambió de versión (se llama con el lock tomado)."""
+        if version != self._version:
+            self._datos.clear()
+            self._version = version
+
+    def obtener(self, version, ph, topn, metodo="lineal"):
+        """Devuelve los resultados guardados para la consulta, o None si no están."""
+        clave = (str(ph), topn, metodo)
+        with self._lock:
+            self._verificar_version(version)
+
+            guardado = self._datos.get(clave)
+            if guardado is not None and self.ttl is not None and time.monotonic() - guardado[0] > self.ttl:
+                del self._datos[clave]
+                guardado = None
+
+            if guardado is None:
+                self.fallos += 1
+                return None
+
+            self._datos.move_to_end(clave)  # pasa a ser el más reciente
+            self.aciertos += 1
+            return guardado[1]
+
+    def guardar(self, version, ph, topn, metodo, resultados):
+        """Guarda los resultados de una consulta, descartando el menos usado si está llena."""
+        clave = (str(ph), topn, metodo)
+        with self._lock:
+            self._verificar_version(version)
+
+            self._datos[clave] = (time.monotonic(), resultados)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+
+    def limpiar(self):
+        """Vacía la caché y reinicia los contadores."""
+        with self._lock:
+            self._datos.clear()
+            self.aciertos = 0
+            self.fallos = 0
+
+    def estadisticas(self):
+        """Devuelve aciertos, fallos, tasa de acierto y ocupación de la caché."""
+        with self._lock:
+            total = self.aciertos + self.fallos
+            return {
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "tasa_acierto": round(self.aciertos / total, 3) if total else 0.0,
+                "entradas": len(self._datos),
+                "max_entradas": self.max_entradas,
+                "ttl": self.ttl,
+                "version_indice": self._version,
+            }
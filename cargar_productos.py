@@ -1,5 +1,7 @@
 import json
 import os
+import re
+from functools import lru_cache
 
 # Importamos las clases de productos según marca
 from producto import (
@@ -62,73 +64,311 @@ def producto_a_dict(producto):
 # ==========================================================
 #       NORMALIZAR PRECIO LEÍDO DESDE JSON / SCRAPING
 # ==========================================================
+# Caracteres que se descartan antes de interpretar el número
+_SIN_SIMBOLOS = str.maketrans("", "", "$ \u00a0\t\r\n")
+
+# Moneda opcional, signo, parte entera (con o sin separador de miles)
+# y hasta dos decimales. Ej: "1.290", "1,290", "1290.00", "1.290,50", "UYU1290"
+_PRECIO = re.compile(
+    r"(?:UYU|USD|US|U)?"
+    r"(?P<signo>-)?"
+    r"(?P<entero>\d{1,3}(?:(?P<miles>[.,])\d{3})(?:(?P=miles)\d{3})*|\d+)"
+    r"(?:(?P<decimal>[.,])(?P<decimales>\d{1,2}))?"
+)
+
+# Motivos de error que se registran en el reporte de validación
+PRECIO_VACIO = "precio_vacio"
+PRECIO_INVALIDO = "precio_invalido"
+PRECIO_NEGATIVO = "precio_negativo"
+PRECIO_CERO = "precio_cero"
+SIN_NOMBRE = "sin_nombre"
+SIN_LINK = "sin_link"
+
+
+def analizar_precio(valor):
+    """
+    Convierte un precio a número y devuelve (precio, motivo_de_error).
+    Los precios sin centavos quedan como entero y los que tienen centavos
+    como float con 2 decimales. Si el precio es válido, el motivo es None;
+    si no se puede interpretar, el precio es 0.
+
+    Con un solo separador seguido de 3 dígitos se toma como separador de
+    miles ("1.290" → 1290); con 1 o 2 dígitos, como decimal ("1290.00" → 1290,
+    "12,50" → 12.5). Si aparecen los dos, el último es el decimal
+    ("1.290,50" → 1290.5).
+    """
+    # Los scrapers guardan el precio como texto: es el caso más común
+    if isinstance(valor, str):
+        return _analizar_texto_precio(valor)
+
+    if valor is None:
+        return 0, PRECIO_VACIO
+
+    if isinstance(valor, bool):
+        return 0, PRECIO_INVALIDO
+
+    if isinstance(valor, int):
+        precio = valor
+    elif isinstance(valor, float):
+        if valor != valor or valor in (float("inf"), float("-inf")):
+            return 0, PRECIO_INVALIDO
+        precio = _con_centavos(valor)
+    else:
+        return _analizar_texto_precio(str(valor))
+
+    return _validar_rango(precio)
+
+
+@lru_cache(maxsize=8192)
+def _analizar_texto_precio(texto):
+    """
+    Interpreta un precio escrito como texto. Los catálogos repiten mucho
+    los mismos precios, así que el resultado se guarda en caché por texto.
+    """
+    texto = texto.translate(_SIN_SIMBOLOS)
+    if not texto:
+        return 0, PRECIO_VACIO
+
+    # Caso más común: solo dígitos
+    if texto.isdigit():
+        return _validar_rango(int(texto))
+
+    m = _PRECIO.fullmatch(texto)
+    if m is None or (m["decimal"] and m["decimal"] == m["miles"]):
+        return 0, PRECIO_INVALIDO
+
+    precio = int(m["entero"].replace(".", "").replace(",", ""))
+    if m["decimales"]:
+        precio = _con_centavos(precio + int(m["decimales"].ljust(2, "0")) / 100)
+    if m["signo"]:
+        precio = -precio
+
+    return _validar_rango(precio)
+
+
+def _con_centavos(valor):
+    """Redondea a centavos; si no quedan centavos devuelve un entero (1290.0 → 1290)."""
+    valor = round(valor, 2)
+    return int(valor) if valor.is_integer() else valor
+
+
+def _validar_rango(precio):
+    """Devuelve (precio, motivo) rechazando precios negativos o en cero."""
+    if precio < 0:
+        return 0, PRECIO_NEGATIVO
+    if precio == 0:
+        return 0, PRECIO_CERO
+    return precio, None
+
+
 def normalizar_precio(valor):
     """
-    Convierte cualquier precio a un entero.
+    Convierte cualquier precio a número (entero, o con centavos si los tiene).
     Admite formatos como:
-    '1290', 1290, 1290.0, '1290.00', '$1.290', '1,290', etc.
+    '1290', 1290, 1290.0, '1290.00', '$1.290', '1,290', '1.290,50', etc.
+    Si no se puede interpretar devuelve 0 (el motivo lo da analizar_precio).
     """
+    return analizar_precio(valor)[0]
 
-    if valor is None:
-        return 0
 
-    # Lo convertimos a string para poder limpiar caracteres
-    texto = str(valor)
+# ==========================================================
+#            REPORTE DE VALIDACIÓN DE LA CARGA
+# ==========================================================
+class ReporteValidacion:
+    """
+    Junta los errores de validación encontrados mientras se cargan los
+    productos, así no hace falta volver a recorrer el catálogo para buscarlos.
+
+    Cada error es un diccionario:
+        {"archivo", "fila", "nombre", "precio_original", "motivos": [...]}
+    """
+
+    def __init__(self):
+        self.filas = 0
+        self.errores = []
+
+    def registrar(self, item, motivos, archivo=None, fila=None):
+        """Cuenta una fila leída y, si tiene motivos de error, la guarda."""
+        self.filas += 1
+        if motivos:
+            self.errores.append({
+                "archivo": archivo,
+                "fila": fila,
+                "nombre": item.get("nombre"),
+                "precio_original": item.get("precio"),
+                "motivos": motivos,
+            })
+
+    def por_motivo(self):
+        """Cantidad de filas con cada motivo de error."""
+        conteo = {}
+        for error in self.errores:
+            for motivo in error["motivos"]:
+                conteo[motivo] = conteo.get(motivo, 0) + 1
+        return conteo
+
+    def resumen(self):
+        """Reporte completo en un diccionario serializable a JSON."""
+        return {
+            "filas": self.filas,
+            "con_errores": len(self.errores),
+            "por_motivo": self.por_motivo(),
+            "errores": self.errores,
+        }
 
-    # Eliminamos símbolos de formato
-    texto = (
-        texto.replace("$", "")
-             .replace(".", "")
-             .replace(",", "")
-             .strip()
-    )
 
-    try:
-        return int(texto)
-    except:
-        return 0   # Si falla, devolvemos 0 en vez de romper el flujo
+# ==========================================================
+#      LECTURA INCREMENTAL DE ARCHIVOS JSON / JSON LINES
+# ==========================================================
+# Tamaño de cada lectura al recorrer un JSON grande
+TAMANO_BLOQUE = 64 * 1024
+
+_ESPACIOS = re.compile(r"[\s,]*")
+
+# Caracteres con los que puede seguir un número JSON cortado entre bloques
+_CONTINUA_NUMERO = re.compile(r"[\d.eE+-]*")
+
+
+def iterar_array_json(archivo, tamano_bloque=TAMANO_BLOQUE):
+    """
+    Recorre un archivo cuyo contenido es un array JSON ([{...}, {...}])
+    y devuelve sus elementos de a uno, leyendo el archivo por bloques.
+    Así no hace falta tener el archivo entero ni la lista completa en memoria.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    fin_archivo = False
+
+    def leer_mas():
+        nonlocal buffer, pos, fin_archivo
+        bloque = archivo.read(tamano_bloque)
+        if not bloque:
+            fin_archivo = True
+        buffer = buffer[pos:] + bloque
+        pos = 0
+
+    # Buscamos el "[" de apertura
+    while "[" not in buffer:
+        if fin_archivo:
+            return
+        leer_mas()
+    pos = buffer.index("[") + 1
+
+    while True:
+        # Salteamos espacios y comas entre elementos
+        pos = _ESPACIOS.match(buffer, pos).end()
+
+        if pos >= len(buffer):
+            if fin_archivo:
+                raise ValueError("JSON incompleto: falta el ']' de cierre")
+            leer_mas()
+            continue
+
+        if buffer[pos] == "]":
+            return
+
+        try:
+            elemento, fin = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # El elemento quedó cortado entre dos bloques: leemos más
+            if fin_archivo:
+                raise
+            leer_mas()
+            continue
+
+        if not fin_archivo and _CONTINUA_NUMERO.fullmatch(buffer, fin):
+            # Lo que queda del bloque podría ser la continuación de un número
+            # ("1234" o "1500.0" cortados como "12" o "1500."): leemos más
+            leer_mas()
+            continue
+
+        pos = fin
+        yield elemento
+
+
+def iterar_json_lines(archivo):
+    """Devuelve los objetos de un archivo JSON Lines (un objeto por línea)."""
+    for linea in archivo:
+        linea = linea.strip()
+        if linea:
+            yield json.loads(linea)
+
+
+def iterar_items_archivo(ruta):
+    """Devuelve los productos crudos (diccionarios) de un .json o .jsonl de a uno."""
+    with open(ruta, "r", encoding="utf-8") as f:
+        if ruta.endswith(".jsonl"):
+            yield from iterar_json_lines(f)
+        else:
+            yield from iterar_array_json(f)
 
 
 # ==========================================================
 #      CARGAR TODOS LOS PRODUCTOS DESDE JSONS LOCALES
 # ==========================================================
-def cargar_todos_los_productos(carpeta_data):
+def producto_desde_item(item, reporte=None, archivo=None, fila=None):
     """
-    Recorre la carpeta_data, busca archivos .json y carga
-    todos los productos dentro de ellos.
+    Crea el objeto Producto (o subclase según la marca) a partir de un
+    diccionario leído del JSON, limpiando el precio y completando campos.
 
-    - Cada JSON contiene productos de una tienda/marca.
-    - Aquí aplicamos la clase adecuada según la marca.
-    - Limpia el precio y completa campos faltantes.
+    Si se pasa un ReporteValidacion, registra ahí los problemas de la fila
+    (precio inválido o en cero, sin nombre, sin link).
     """
+    marca = item.get("marca", "Desconocida")
+    ClaseProd = clase_segun_marca(marca)
+
+    nombre = item.get("nombre", "Sin nombre")
+    precio, motivo_precio = analizar_precio(item.get("precio"))
+    link = item.get("link") or item.get("url", "")  # fallback por si el campo se llama distinto
+
+    if reporte is not None:
+        motivos = [motivo_precio] if motivo_precio else []
+        if nombre == "":
+            motivos.append(SIN_NOMBRE)
+        if link == "":
+            motivos.append(SIN_LINK)
+        reporte.registrar(item, motivos, archivo, fila)
+
+    # Instanciamos el producto con sus datos
+    return ClaseProd(
+        nombre=nombre,
+        precio=precio,
+        link=link,
+        imagen=item.get("imagen", ""),
+        marca=marca
+    )
+
 
-    productos_totales = []
+def iterar_productos(carpeta_data, reporte=None):
+    """
+    Versión "streaming" de cargar_todos_los_productos: recorre los .json y
+    .jsonl de carpeta_data y va devolviendo los productos de a uno, sin
+    armar la lista completa. La memoria usada no depende del tamaño del catálogo.
 
+    Si se pasa un ReporteValidacion, se completa durante el mismo recorrido.
+    """
     for archivo in os.listdir(carpeta_data):
-        if archivo.endswith(".json"):
+        if archivo.endswith(".json") or archivo.endswith(".jsonl"):
             ruta = os.path.join(carpeta_data, archivo)
 
-            # Abrimos el JSON
-            with open(ruta, "r", encoding="utf-8") as f:
-                datos = json.load(f)
+            for fila, item in enumerate(iterar_items_archivo(ruta)):
+                yield producto_desde_item(item, reporte, archivo, fila)
 
-            # Creamos objetos Producto (o subclases)
-            for item in datos:
-                marca = item.get("marca", "Desconocida")
-                ClaseProd = clase_segun_marca(marca)
 
-                # Instanciamos el producto con sus datos
-                producto = ClaseProd(
-                    nombre=item.get("nombre", "Sin nombre"),
-                    precio=normalizar_precio(item.get("precio", 0)),
-                    link=item.get("link") or item.get("url", ""),  # fallback por si el campo se llama distinto
-                    imagen=item.get("imagen", ""),
-                    marca=marca
-                )
+def cargar_todos_los_productos(carpeta_data, reporte=None):
+    """
+    Recorre la carpeta_data, busca archivos .json / .jsonl y carga
+    todos los productos dentro de ellos.
 
-                productos_totales.append(producto)
+    - Cada archivo contiene productos de una tienda/marca.
+    - Aquí aplicamos la clase adecuada según la marca.
+    - Limpia el precio y completa campos faltantes.
+    - Si se pasa un ReporteValidacion, anota los errores de cada fila.
 
-    return productos_totales
+    Es un envoltorio de iterar_productos que devuelve la lista completa.
+    """
+    return list(iterar_productos(carpeta_data, reporte))
 
 
 # ==========================================================
@@ -0,0 +1,123 @@
+"""
+catalogo_columnar.py
+
+Catálogo guardado "por columnas" en lugar de una lista de objetos:
+
+- precios: arreglo NumPy int64 (float64 si algún precio tiene centavos).
+- marcas: código entero por producto + tabla de nombres de marca.
+- nombres, links, imágenes: tablas de strings (una posición por producto).
+
+Con esta forma, las métricas de agregaciones.py (conteos, promedios, top
+más caros) se calculan con operaciones vectorizadas de NumPy sobre las
+columnas (ver columna() y codigos()) en vez de recorrer objetos en
+Python. Los resultados son los mismos que los de analisis_productos.py.
+
+Es la fuente del panel de análisis: snapshot_analisis.py pasa a columnas
+los productos del catálogo vivo y el motor de agregaciones.py calcula las
+métricas sobre ellas.
+"""
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from agregaciones import a_numero
+from cargar_productos import clase_segun_marca
+
+# Nombre de columna (atributo del Producto) → atributo del catálogo
+_COLUMNAS = {"precio": "precios", "nombre": "nombres", "link": "links", "imagen": "imagenes"}
+
+
+class CatalogoColumnar:
+    """
+    Catálogo en columnas. Las marcas se guardan en el orden en que aparecen
+    por primera vez, igual que los diccionarios que arma analisis_productos.py.
+    """
+
+    def __init__(self, nombres, precios, links, imagenes, marca_codigos, marcas):
+        self.nombres = nombres
+        self.precios = precios
+        self.links = links
+        self.imagenes = imagenes
+        self.marca_codigos = marca_codigos
+        self.marcas = marcas
+
+    @classmethod
+    def desde_productos(cls, productos):
+        """Arma el catálogo a partir de cualquier iterable de Producto (lista o generador)."""
+        nombres, precios, links, imagenes, codigos = [], [], [], [], []
+        marcas = []
+        codigo_de = {}
+        con_centavos = False
+
+        for p in productos:
+            codigo = codigo_de.get(p.marca)
+            if codigo is None:
+                codigo = codigo_de[p.marca] = len(marcas)
+                marcas.append(p.marca)
+
+            nombres.append(p.nombre)
+            precios.append(p.precio)
+            con_centavos = con_centavos or isinstance(p.precio, float)
+            links.append(p.link)
+            imagenes.append(p.imagen)
+            codigos.append(codigo)
+
+        return cls(
+            nombres=nombres,
+            precios=np.array(precios, dtype=np.float64 if con_centavos else np.int64),
+            links=links,
+            imagenes=imagenes,
+            marca_codigos=np.array(codigos, dtype=np.int32),
+            marcas=marcas,
+        )
+
+    def __len__(self):
+        return len(self.precios)
+
+    def __iter__(self):
+        """Recorre el catálogo como objetos Producto (para métricas no vectorizables)."""
+        return (self.producto(i) for i in range(len(self)))
+
+    def columna(self, nombre):
+        """Columna de un atributo del producto ("precio" es un arreglo NumPy)."""
+        if nombre == "marca":
+            return [self.marcas[c] for c in self.marca_codigos.tolist()]
+        return getattr(self, _COLUMNAS[nombre])
+
+    def codigos(self, nombre, vacio=None):
+        """
+        Devuelve (códigos, etiquetas) para agrupar por una columna: un código
+        entero por producto, numerado en el orden en que aparece cada valor.
+        Con `vacio`, los valores vacíos se agrupan bajo esa etiqueta.
+        """
+        if nombre == "marca":
+            codigos, etiquetas = self.marca_codigos, self.marcas
+        else:
+            codigo_de = {}
+            codigos = np.fromiter((codigo_de.setdefault(v, len(codigo_de)) for v in self.columna(nombre)),
+                                  dtype=np.int32, count=len(self))
+            etiquetas = list(codigo_de)
+
+        if vacio is None:
+            return codigos, etiquetas
+
+        # Se renombran los vacíos y se unen las etiquetas que quedan repetidas
+        nuevo_de = {}
+        mapa = np.array([nuevo_de.setdefault(e or vacio, len(nuevo_de)) for e in etiquetas], dtype=np.int32)
+        return mapa[codigos], list(nuevo_de)
+
+    def producto(self, i):
+        """Reconstruye el objeto Producto (subclase según marca) de la posición i."""
+        marca = self.marcas[self.marca_codigos[i]]
+        return clase_segun_marca(marca)(
+            nombre=self.nombres[i],
+            precio=a_numero(self.precios[i]),
+            link=self.links[i],
+            imagen=self.imagenes[i],
+            marca=marca
+        )
+
@@ -0,0 +1,215 @@
+"""
+catalogo_vivo.py
+
+Catálogo que se puede recargar sin reiniciar el servidor.
+
+Guarda los productos separados por archivo de data/ junto con la "firma"
+de cada archivo (tamaño y fecha de modificación). Al recargar:
+
+1. Solo se vuelven a leer los archivos cuya firma cambió (o los nuevos);
+   los de las otras marcas se reutilizan tal cual.
+2. Si hubo cambios, se sincroniza el índice de imágenes, que descarga y
+   hashea únicamente las URLs nuevas (ver sincronizar_indice). Aunque no
+   haya cambios, se sincroniza si vence la espera de alguna imagen que
+   falló o si se pide revalidar las imágenes.
+3. Se leen los deltas nuevos que dejaron los scrapers en data/cambios/
+   (ver data/cambios.py) y solo las imágenes de "revisar_imagenes" se
+   piden de forma condicional (ETag / Last-Modified) en esa misma
+   sincronización. Los deltas que ya estaban al arrancar no se aplican:
+   el arranque ya sincroniza todo el catálogo.
+4. Recién con el índice listo se reemplaza la lista de productos.
+
+Tanto la lista como el índice se reemplazan con una asignación, así las
+consultas en curso siguen usando la versión anterior hasta terminar.
+
+Cada catálogo publicado lleva un número de generación y el reporte de
+validación armado al leer sus archivos: el panel de análisis
+(snapshot_analisis.py) se calcula sobre estos mismos productos, sin
+volver a leer data/.
+
+La recarga se puede disparar a mano (recargar()) o dejar un hilo que
+revise la carpeta cada cierto tiempo (iniciar_vigilancia()).
+"""
+
+import json
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cargar_productos import ReporteValidacion, iterar_items_archivo, producto_desde_item
+
+# Segundos entre revisiones de la carpeta cuando se vigila en segundo plano
+INTERVALO_VIGILANCIA = 30
+
+
+def _firmas_archivos(carpeta_data):
+    """Devuelve { nombre_archivo : (tamaño, mtime_ns) } de los .json / .jsonl de la carpeta."""
+    firmas = {}
+    with os.scandir(carpeta_data) as entradas:
+        for e in entradas:
+            if e.is_file() and e.name.endswith((".json", ".jsonl")):
+                info = e.stat()
+                firmas[e.name] = (info.st_size, info.st_mtime_ns)
+    return firmas
+
+
+def _deltas(carpeta_cambios):
+    """Nombres de los deltas de data/cambios/ (sin los validadores HTTP de cada tienda)."""
+    try:
+        nombres = os.listdir(carpeta_cambios)
+    except FileNotFoundError:
+        return []
+    return sorted(n for n in nombres if n.endswith(".json") and not n.endswith("-validadores.json"))
+
+
+def _imagenes_a_revisar(carpeta_cambios, nombres):
+    """Unión de las URLs de "revisar_imagenes" de los deltas `nombres`."""
+    urls = set()
+    for nombre in nombres:
+        try:
+            with open(os.path.join(carpeta_cambios, nombre), "r", encoding="utf-8") as f:
+                urls.update(json.load(f).get("revisar_imagenes", []))
+        except Exception as e:
+            print(f"⚠ No se pudo leer el delta {nombre}: {e}")
+    return urls
+
+
+class CatalogoVivo:
+    """
+    Productos de carpeta_data, recargables por archivo.
+
+    - indice: IndiceResidente opcional; si está, se sincroniza en cada
+      recarga con cambios antes de publicar el catálogo nuevo.
+    - publicado: (generación, productos, reporte de validación) del último
+      catálogo publicado. Se reemplaza entero, así los tres corresponden
+      siempre a la misma versión.
+    """
+
+    def __init__(self, carpeta_data, indice=None):
+        self.carpeta_data = carpeta_data
+        self.carpeta_cambios = os.path.join(carpeta_data, "cambios")
+        self.indice = indice
+
+        self._archivos = {}   # nombre → (firma, [productos], ReporteValidacion)
+        self._publicado = (0, [], ReporteValidacion())
+        self._lock = threading.Lock()  # una sola recarga a la vez
+        self._hilo = None
+        self._detener = threading.Event()
+        self._deltas_aplicados = set(_deltas(self.carpeta_cambios))
+
+        self.recargar()
+
+    @property
+    def productos(self):
+        return self._publicado[1]
+
+    @property
+    def generacion(self):
+        """Número del catálogo publicado; sube con cada recarga que cambia algún archivo."""
+        return self._publicado[0]
+
+    @property
+    def publicado(self):
+        return self._publicado
+
+    def recargar(self, revalidar=False):
+        """
+        Relee los archivos que cambiaron y publica el catálogo nuevo.
+
+        - revalidar: True (o un conjunto de URLs) para pedir de forma
+          condicional las imágenes ya indexadas y re-hashear las que cambiaron.
+          Se le suman las imágenes a revisar de los deltas nuevos.
+
+        Devuelve {"actualizados": [...], "eliminados": [...], "con_error": [...],
+        "deltas": [...]}.
+        """
+        with self._lock:
+            firmas = _firmas_archivos(self.carpeta_data)
+            archivos = dict(self._archivos)
+            deltas = [n for n in _deltas(self.carpeta_cambios) if n not in self._deltas_aplicados]
+            cambios = {"actualizados": [], "eliminados": [], "con_error": [], "deltas": deltas}
+
+            # Imágenes que un scraper marcó para revisar (misma URL, producto cambiado)
+            if revalidar is not True:
+                revalidar = (set(revalidar or ()) | _imagenes_a_revisar(self.carpeta_cambios, deltas)) or False
+
+            for nombre in list(archivos):
+                if nombre not in firmas:
+                    del archivos[nombre]
+                    cambios["eliminados"].append(nombre)
+
+            for nombre, firma in firmas.items():
+                anterior = archivos.get(nombre)
+                if anterior is not None and anterior[0] == firma:
+                    continue
+
+                ruta = os.path.join(self.carpeta_data, nombre)
+                reporte = ReporteValidacion()
+                try:
+                    productos = [producto_desde_item(item, reporte, nombre, fila)
+                                 for fila, item in enumerate(iterar_items_archivo(ruta))]
+                except Exception as e:
+                    # Puede estar a medio escribir (un scraper corriendo):
+                    # se deja la versión anterior y se reintenta en la próxima revisión
+                    print(f"⚠ No se pudo recargar {nombre}: {e}")
+                    cambios["con_error"].append(nombre)
+                    continue
+
+                archivos[nombre] = (firma, productos, reporte)
+                cambios["actualizados"].append(nombre)
+
+            if not cambios["actualizados"] and not cambios["eliminados"]:
+                # Mismo catálogo: el índice solo se toca para reintentar o revalidar imágenes
+                if self.indice is not None and (revalidar or self.indice.reintento_vencido()):
+                    self.indice.refrescar(self.productos, revalidar=revalidar)
+                self._deltas_aplicados.update(cambios["deltas"])
+                return cambios
+
+            # Mismo orden de archivos que cargar_todos_los_productos
+            nombres = [nombre for nombre in firmas if nombre in archivos]
+            nuevos = [p for nombre in nombres for p in archivos[nombre][1]]
+
+            # Reporte de validación del catálogo completo (une el de cada archivo)
+            reporte = ReporteValidacion()
+            for nombre in nombres:
+                reporte.filas += archivos[nombre][2].filas
+                reporte.errores.extend(archivos[nombre][2].errores)
+
+            # Primero el índice (solo procesa las URLs nuevas) y después el catálogo
+            if self.indice is not None:
+                self.indice.refrescar(nuevos, revalidar=revalidar)
+
+            self._archivos = archivos
+            self._publicado = (self._publicado[0] + 1, nuevos, reporte)
+            self._deltas_aplicados.update(cambios["deltas"])
+            return cambios
+
+    # ------------------------------------------------------
+    #   Vigilancia en segundo plano
+    # ------------------------------------------------------
+    def iniciar_vigilancia(self, intervalo=INTERVALO_VIGILANCIA):
+        """Arranca un hilo que llama a recargar() cada `intervalo` segundos."""
+        if self._hilo is not None and self._hilo.is_alive():
+            return
+
+        def _vigilar():
+            while not self._detener.wait(intervalo):
+                try:
+                    cambios = self.recargar()
+                    if cambios["actualizados"] or cambios["eliminados"] or cambios["deltas"]:
+                        print(f"🔄 Catálogo recargado: {cambios}")
+                except Exception as e:
+                    print(f"⚠ Error al recargar el catálogo: {e}")
+
+        self._detener.clear()
+        self._hilo = threading.Thread(target=_vigilar, name="vigilancia-catalogo", daemon=True)
+        self._hilo.start()
+
+    def detener_vigilancia(self):
+        """Detiene el hilo de vigilancia (si estaba corriendo)."""
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join()
+            self._hilo = None
@@ -0,0 +1,161 @@
+"""
+cambios.py
+
+Detección de cambios entre dos corridas de un scraper.
+
+Antes de scrapear se lee el archivo publicado de la tienda (la corrida
+anterior) indexado por link. Al terminar se compara con el archivo nuevo
+y se escribe un "delta" en data/cambios/ con:
+
+- agregados: productos nuevos,
+- eliminados: productos que ya no están en el listado,
+- cambio_precio: mismo link, otro precio (comparado ya normalizado),
+- cambio_imagen: mismo link, otra URL de imagen,
+- revisar_imagenes: URLs de imagen de productos que cambiaron (precio o
+  nombre) pero conservan la misma URL; la tienda pudo haber reemplazado
+  la foto sin cambiar la dirección.
+
+El catálogo vivo (catalogo_vivo.py) lee los deltas nuevos al recargar y
+pide de forma condicional solo las imágenes de revisar_imagenes; las
+URLs nuevas o cambiadas ya las descarga la sincronización por URL.
+
+También guarda, por tienda, los validadores HTTP (ETag / Last-Modified)
+de las páginas de producto, para que la próxima corrida las pida de
+forma condicional y reutilice las que respondan 304 (sin cambios).
+
+La carpeta cambios/ no la lee cargar_todos_los_productos (solo mira los
+.json / .jsonl sueltos de data/).
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+CARPETA_DATA = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(CARPETA_DATA))
+
+from cargar_productos import iterar_items_archivo, normalizar_precio
+
+# Carpeta de los deltas y de los validadores HTTP
+CARPETA_CAMBIOS = os.path.join(CARPETA_DATA, "cambios")
+
+
+def leer_anteriores(*rutas):
+    """
+    Devuelve { link : producto } del primer archivo que exista entre `rutas`
+    (por ejemplo, el .jsonl publicado y, si no hay, el .json anterior).
+    """
+    for ruta in rutas:
+        if ruta and os.path.exists(ruta):
+            return {
+                item.get("link") or item.get("url"): item
+                for item in iterar_items_archivo(ruta)
+            }
+    return {}
+
+
+def calcular_delta(anteriores, actuales):
+    """
+    Compara { link : producto } de la corrida anterior con los productos
+    actuales (cualquier iterable, se recorre una sola vez).
+    """
+    agregados, cambio_precio, cambio_imagen = [], [], []
+    revisar_imagenes = {}
+    vistos = set()
+
+    for item in actuales:
+        link = item.get("link") or item.get("url")
+        vistos.add(link)
+
+        anterior = anteriores.get(link)
+        if anterior is None:
+            agregados.append(item)
+            continue
+
+        antes, despues = normalizar_precio(anterior.get("precio")), normalizar_precio(item.get("precio"))
+        if antes != despues:
+            cambio_precio.append({"link": link, "nombre": item.get("nombre"), "antes": antes, "despues": despues})
+
+        if anterior.get("imagen") != item.get("imagen"):
+            cambio_imagen.append({"link": link, "nombre": item.get("nombre"),
+                                  "antes": anterior.get("imagen"), "despues": item.get("imagen")})
+        elif item.get("imagen") and (antes != despues or anterior.get("nombre") != item.get("nombre")):
+            revisar_imagenes[item["imagen"]] = None
+
+    eliminados = [item for link, item in anteriores.items() if link not in vistos]
+
+    return {
+        "agregados": agregados,
+        "eliminados": eliminados,
+        "cambio_precio": cambio_precio,
+        "cambio_imagen": cambio_imagen,
+        "revisar_imagenes": list(revisar_imagenes),
+    }
+
+
+def guardar_delta(tienda, archivo, delta, carpeta=CARPETA_CAMBIOS):
+    """
+    Guarda el delta en cambios/<tienda>-<fecha>.json y lo resume en consola.
+    Devuelve la ruta escrita.
+    """
+    os.makedirs(carpeta, exist_ok=True)
+    fecha = time.strftime("%Y%m%d-%H%M%S")
+    ruta = os.path.join(carpeta, f"{_nombre_archivo(tienda)}-{fecha}.json")
+    n = 1
+    while os.path.exists(ruta):  # dos corridas en el mismo segundo
+        n += 1
+        ruta = os.path.join(carpeta, f"{_nombre_archivo(tienda)}-{fecha}-{n}.json")
+
+    resumen = {clave: len(valores) for clave, valores in delta.items()}
+    contenido = {"tienda": tienda, "archivo": archivo, "fecha": fecha, "resumen": resumen, **delta}
+    # Atómico: el catálogo vivo puede leer la carpeta mientras se escribe
+    fd, tmp = tempfile.mkstemp(dir=carpeta)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(contenido, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, ruta)
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+    print(f"🧾 Cambios de {tienda}: +{resumen['agregados']} / -{resumen['eliminados']} / "
+          f"{resumen['cambio_precio']} precios / {resumen['cambio_imagen']} imágenes "
+          f"({resumen['revisar_imagenes']} a revalidar) → {ruta}")
+    return ruta
+
+
+# ==========================================================
+#            VALIDADORES HTTP DE PÁGINAS DE PRODUCTO
+# ==========================================================
+def _nombre_archivo(tienda):
+    return tienda.lower().replace(" ", "")
+
+
+def _ruta_validadores(tienda, carpeta):
+    return os.path.join(carpeta, f"{_nombre_archivo(tienda)}-validadores.json")
+
+
+def cargar_validadores(tienda, carpeta=CARPETA_CAMBIOS):
+    """Devuelve { link : (etag, last_modified) } guardados en la corrida anterior."""
+    try:
+        with open(_ruta_validadores(tienda, carpeta), "r", encoding="utf-8") as f:
+            return {link: tuple(valores) for link, valores in json.load(f).items()}
+    except Exception:
+        return {}
+
+
+def guardar_validadores(tienda, validadores, carpeta=CARPETA_CAMBIOS):
+    """Guarda { link : (etag, last_modified) } de forma atómica."""
+    os.makedirs(carpeta, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=carpeta)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({link: list(valores) for link, valores in validadores.items()}, f)
+        os.replace(tmp, _ruta_validadores(tienda, carpeta))
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
@@ -0,0 +1,65 @@
+"""
+parseo_html.py
+
+Capa de parseo HTML de los scrapers.
+
+Antes cada scraper armaba el árbol completo de la página con
+BeautifulSoup(html, "html.parser") (todo en Python puro) y después
+buscaba los productos con select. En los listados de scroll infinito,
+de varios MB, ese era el paso de CPU más lento. Acá:
+
+- se usa lxml como parser (en C) si está instalado, y
+- para los listados, un SoupStrainer hace que solo se construyan los
+  nodos de producto (y lo que tienen adentro); el resto de la página
+  (menús, scripts, íconos) se descarta mientras se lee.
+
+Los nodos siguen siendo de BeautifulSoup, así que las reglas de cada
+tienda (select_one, get_text, ...) no cambian y los productos que salen
+son los mismos. benchmark_parseo.py lo compara contra el parseo anterior.
+"""
+
+import re
+from importlib.util import find_spec
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+# lxml es opcional: si no está instalado se usa el parser de Python
+PARSER_RAPIDO = "lxml" if find_spec("lxml") else "html.parser"
+
+# Parser que usaban los scrapers originalmente (referencia del benchmark)
+PARSER_ORIGINAL = "html.parser"
+
+# Selectores simples que se pueden filtrar mientras se lee: "div", "div.it", "a[href]"
+_SELECTOR_SIMPLE = re.compile(r"^(?P<etiqueta>[a-zA-Z][\w-]*)(?:\.(?P<clase>[\w-]+))?(?:\[(?P<atributo>[\w-]+)\])?$")
+
+
+def filtro_para(selector):
+    """
+    Devuelve un SoupStrainer que conserva solo los nodos de `selector`,
+    o None si el selector no es simple (entonces se parsea toda la página).
+    """
+    m = _SELECTOR_SIMPLE.match(selector.strip())
+    if m is None:
+        return None
+
+    atributos = {}
+    if m["clase"]:
+        atributos["class"] = m["clase"]
+    if m["atributo"]:
+        atributos[m["atributo"]] = True
+    return SoupStrainer(m["etiqueta"], attrs=atributos)
+
+
+def sopa(html, parser=None):
+    """Arma el árbol completo de una página (por ejemplo, una página de producto)."""
+    return BeautifulSoup(html, parser or PARSER_RAPIDO)
+
+
+def nodos_producto(html, selector, parser=None, filtrar=True):
+    """
+    Devuelve los nodos de `selector` de un listado. Con filtrar=True solo
+    se construyen esos nodos, no el árbol de toda la página.
+    """
+    filtro = filtro_para(selector) if filtrar else None
+    soup = BeautifulSoup(html, parser or PARSER_RAPIDO, parse_only=filtro)
+    return soup.select(selector)
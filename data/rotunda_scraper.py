@@ -1,10 +1,7 @@
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
-from bs4 import BeautifulSoup
-import json
-import time
+import sys
+
+from scraper_base import ScraperBase, abrir_chrome
+from scroll_infinito import scroll_hasta_el_final
 
 
 def is_valid_image(url: str) -> bool:
@@ -20,45 +17,34 @@ def is_valid_image(url: str) -> bool:
     return False
 
 
-def scrape_rotunda():
-    """Scrapea todos los productos de Rotunda y guarda el JSON final."""
-    options = Options()
-    options.add_argument("--headless=new")  # quitalo si querés ver el scroll
-    options.add_argument("--disable-gpu")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--window-size=1920,3000")
-
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-    driver.get("https://www.rotundastore.com/clothes")
-
-    # --- Scroll dinámico hasta el final ---
-    last_height = 0
-    same_count = 0
-    while True:
-        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-        time.sleep(2)
-        new_height = driver.execute_script("return document.body.scrollHeight")
-        if new_height == last_height:
-            same_count += 1
-            if same_count >= 3:
-                break
-        else:
-            same_count = 0
-        last_height = new_height
+class ScraperRotunda(ScraperBase):
+    """Listado de ropa de Rotunda (Selenium + scroll infinito)."""
 
-    html = driver.page_source
-    driver.quit()
+    MARCA = "Rotunda"
+    URL_LISTADO = "https://www.rotundastore.com/clothes"
+    SELECTOR_PRODUCTO = "div.it"
+    SALIDA = "productos_rotunda.jsonl"
+    LEGADO = "productos_rotunda.json"
 
-    soup = BeautifulSoup(html, "html.parser")
-    productos = []
+    def obtener_html_listado(self):
+        # headless: quitalo (headless=False) si querés ver el scroll
+        driver = abrir_chrome(tamano="1920,3000", argumentos=["--disable-gpu"])
+        try:
+            driver.get(self.URL_LISTADO)
 
-    for item in soup.select("div.it"):
+            # --- Scroll dinámico hasta el final (espera a que carguen productos nuevos) ---
+            scroll_hasta_el_final(driver, self.SELECTOR_PRODUCTO)
+            return driver.page_source
+        finally:
+            driver.quit()
+
+    def parsear(self, item):
         nombre_tag = item.select_one("div.info a.tit h2")
         precio_tag = item.select_one("div.info strong.precio span.monto")
         link_tag = item.select_one("div.info a.tit")
 
         if not (nombre_tag and precio_tag and link_tag):
-            continue
+            return None
 
         nombre = nombre_tag.get_text(strip=True)
         precio = precio_tag.get_text(strip=True)
@@ -77,26 +63,21 @@ def scrape_rotunda():
                 img_url = src
                 break
 
-        productos.append({
+        return {
             "nombre": nombre,
             "precio": precio,
             "link": link,
             "imagen": img_url,
-            "marca": "Rotunda"
-        })
+            "marca": self.MARCA
+        }
 
-    # --- Guardar productos en archivo final ---
-    output_path = "productos_rotunda.json"
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(productos, f, ensure_ascii=False, indent=2)
 
-    print(f"✅ {len(productos)} productos guardados en {output_path}")
-    return productos
+def scrape_rotunda(reanudar=True, incremental=True):
+    """Scrapea todos los productos de Rotunda y los guarda en productos_rotunda.jsonl."""
+    return ScraperRotunda().ejecutar(reanudar=reanudar, incremental=incremental)
 
 
 if __name__ == "__main__":
-    scrape_rotunda()
-
-
-
-
+    # python rotunda_scraper.py --desde-cero  → ignora una corrida anterior cortada
+    # python rotunda_scraper.py --completo    → no compara con la corrida anterior ni guarda el delta
+    scrape_rotunda(reanudar="--desde-cero" not in sys.argv, incremental="--completo" not in sys.argv)
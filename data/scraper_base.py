@@ -0,0 +1,218 @@
+"""
+scraper_base.py
+
+Base común de los scrapers de data/.
+
+Cada tienda solo define sus reglas (URL del listado, selector de cada
+producto y cómo parsear un nodo); la base se encarga del resto:
+
+- abrir el navegador y hacer scroll del listado (scroll_infinito.py),
+- recorrer los nodos de producto y parsearlos (parseo_html.py),
+- escribir cada producto apenas se parsea en un archivo JSON Lines,
+- retomar una corrida cortada sin repetir los productos ya guardados,
+- comparar con la corrida anterior y guardar qué cambió (cambios.py).
+
+Mientras corre, la salida se escribe en "<archivo>.jsonl.parcial" (que
+cargar_todos_los_productos ignora). Al terminar se renombra a ".jsonl",
+que el cargador lee directamente, y reemplaza al ".json" anterior de la
+misma tienda. Si la corrida se corta, el ".parcial" queda como punto de
+control y la próxima corrida sigue desde ahí.
+
+La memoria no depende del tamaño del listado: los productos no se juntan
+en una lista, se van escribiendo.
+"""
+
+import json
+import os
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from webdriver_manager.chrome import ChromeDriverManager
+
+from cambios import calcular_delta, guardar_delta, leer_anteriores
+from cargar_productos import iterar_items_archivo
+from parseo_html import nodos_producto
+
+# Los archivos de salida quedan en data/, junto a los scrapers
+CARPETA_SALIDA = os.path.dirname(os.path.abspath(__file__))
+
+SUFIJO_PARCIAL = ".parcial"
+
+
+def abrir_chrome(headless=True, tamano="1920,1080", argumentos=()):
+    """Abre un Chrome (Selenium) con las opciones que usan los scrapers."""
+    options = Options()
+    if headless:
+        options.add_argument("--headless=new")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument(f"--window-size={tamano}")
+    for argumento in argumentos:
+        options.add_argument(argumento)
+    service = Service(ChromeDriverManager().install())
+    return webdriver.Chrome(service=service, options=options)
+
+
+# ==========================================================
+#              SALIDA JSON LINES CON PUNTO DE CONTROL
+# ==========================================================
+class SalidaJsonLines:
+    """
+    Escribe productos de a uno en un archivo JSON Lines.
+
+    - ruta: archivo final (.jsonl).
+    - reanudar: si hay un ".parcial" de una corrida anterior, se sigue
+      escribiendo ahí y ya_guardado() informa qué links ya están.
+    - ruta_legado: archivo anterior de la tienda (.json) que se borra
+      al completar, para que el cargador no lea los productos dos veces.
+    """
+
+    def __init__(self, ruta, reanudar=True, ruta_legado=None):
+        self.ruta = ruta
+        self.ruta_parcial = ruta + SUFIJO_PARCIAL
+        self.reanudar = reanudar
+        self.ruta_legado = ruta_legado
+
+        self.guardados = set()
+        self.escritos = 0
+        self._archivo = None
+
+    def __enter__(self):
+        if self.reanudar:
+            self.guardados = self._leer_punto_de_control()
+        elif os.path.exists(self.ruta_parcial):
+            os.remove(self.ruta_parcial)
+
+        self._archivo = open(self.ruta_parcial, "a", encoding="utf-8")
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        # Si hubo un error, el ".parcial" queda como punto de control
+        if self._archivo is not None:
+            self._archivo.close()
+            self._archivo = None
+        return False
+
+    def _leer_punto_de_control(self):
+        """
+        Lee los links del ".parcial" anterior. Si la última línea quedó
+        a medio escribir (corte abrupto), se descarta.
+        """
+        if not os.path.exists(self.ruta_parcial):
+            return set()
+
+        guardados = set()
+        valido = 0
+        with open(self.ruta_parcial, "rb") as f:
+            for linea in f:
+                try:
+                    producto = json.loads(linea)
+                except ValueError:
+                    break
+                if not linea.endswith(b"\n"):
+                    break
+                guardados.add(producto.get("link"))
+                valido += len(linea)
+
+        with open(self.ruta_parcial, "r+b") as f:
+            f.truncate(valido)
+        return guardados
+
+    def ya_guardado(self, link):
+        return link in self.guardados
+
+    def escribir(self, producto):
+        """Agrega un producto al archivo y lo deja en disco enseguida."""
+        self._archivo.write(json.dumps(producto, ensure_ascii=False) + "\n")
+        self._archivo.flush()
+        self.guardados.add(producto.get("link"))
+        self.escritos += 1
+
+    def completar(self):
+        """Publica el archivo final (.jsonl) y borra el de formato anterior."""
+        self._archivo.close()
+        self._archivo = None
+        os.replace(self.ruta_parcial, self.ruta)
+        if self.ruta_legado and os.path.exists(self.ruta_legado):
+            os.remove(self.ruta_legado)
+
+
+# ==========================================================
+#                     SCRAPER BASE
+# ==========================================================
+class ScraperBase:
+    """
+    Scraper de una tienda. Las subclases definen:
+
+    - MARCA, URL_LISTADO, SELECTOR_PRODUCTO, SALIDA (y opcionalmente LEGADO),
+    - obtener_html_listado(): HTML del listado ya scrolleado,
+    - parsear(nodo): diccionario del producto, o None si el nodo no sirve.
+
+    Las tiendas cuyo flujo es distinto (por ejemplo, que entran a cada
+    página de producto) pueden redefinir iterar_productos(). Durante
+    ejecutar(), self.anteriores tiene { link : producto } de la corrida
+    anterior, para reutilizar lo que no cambió.
+    """
+
+    MARCA = None
+    URL_LISTADO = None
+    SELECTOR_PRODUCTO = None
+    SALIDA = None          # archivo .jsonl de salida
+    LEGADO = None          # archivo .json anterior que reemplaza
+    PARSER = None          # None = el más rápido disponible (lxml si está instalado)
+
+    anteriores = {}
+
+    def obtener_html_listado(self):
+        raise NotImplementedError
+
+    def parsear(self, nodo):
+        raise NotImplementedError
+
+    def iterar_nodos(self, html):
+        """Devuelve los nodos de producto del listado (sin construir el resto de la página)."""
+        return nodos_producto(html, self.SELECTOR_PRODUCTO, parser=self.PARSER)
+
+    def iterar_productos(self, ya_guardado):
+        """Devuelve los productos de a uno. `ya_guardado(link)` permite saltear los de una corrida anterior."""
+        html = self.obtener_html_listado()
+        for nodo in self.iterar_nodos(html):
+            producto = self.parsear(nodo)
+            if producto:
+                yield producto
+
+    def ejecutar(self, reanudar=True, carpeta=CARPETA_SALIDA, incremental=True):
+        """
+        Scrapea la tienda escribiendo cada producto en SALIDA a medida que
+        se obtiene. Devuelve la cantidad de productos del archivo final.
+
+        Con incremental=True se compara el resultado con el archivo
+        publicado antes y se guarda el delta en data/cambios/.
+        """
+        ruta = os.path.join(carpeta, self.SALIDA)
+        ruta_legado = os.path.join(carpeta, self.LEGADO) if self.LEGADO else None
+
+        # La corrida anterior se lee antes de que el archivo nuevo la reemplace
+        self.anteriores = leer_anteriores(ruta, ruta_legado) if incremental else {}
+
+        with SalidaJsonLines(ruta, reanudar=reanudar, ruta_legado=ruta_legado) as salida:
+            previos = len(salida.guardados)
+            if previos:
+                print(f"↪ Retomando {self.SALIDA}: {previos} productos ya guardados")
+
+            for producto in self.iterar_productos(salida.ya_guardado):
+                producto.setdefault("marca", self.MARCA)
+                if salida.ya_guardado(producto.get("link")):
+                    continue
+                salida.escribir(producto)
+
+            salida.completar()
+            total = len(salida.guardados)
+
+        print(f"✅ {total} productos de {self.MARCA} guardados en {ruta} ({salida.escritos} nuevos)")
+
+        if self.anteriores:
+            delta = calcular_delta(self.anteriores, iterar_items_archivo(ruta))
+            guardar_delta(self.MARCA, self.SALIDA, delta)
+        return total
@@ -0,0 +1,137 @@
+"""
+scroll_infinito.py
+
+Scroll hasta el final de un listado con "scroll infinito", compartido por
+los tres scrapers (Selenium o Playwright).
+
+En lugar de dormir un tiempo fijo después de cada scroll y cortar tras
+varias alturas repetidas, se espera a señales reales de la página:
+
+- que aumente la cantidad de productos (nodos que cumplen `selector`),
+- que el DOM deje de cambiar (MutationObserver) y
+- que no lleguen recursos nuevos por la red (Resource Timing).
+
+Apenas aparecen productos nuevos y la página queda quieta, se sigue con
+el próximo scroll. Si no aparece nada, se espera hasta un tiempo máximo
+que se adapta a lo que viene tardando la página en cargar cada tanda.
+
+Devuelve (y opcionalmente imprime) cuántos productos trajo cada scroll y
+cuánto tardó, para ver dónde se va el tiempo.
+"""
+
+import json
+import time
+from collections import namedtuple
+
+# Resultado de cada scroll: productos nuevos, total acumulado y segundos de espera
+Scroll = namedtuple("Scroll", ["numero", "nuevos", "total", "segundos"])
+
+# Instala (una sola vez por página) el registro de la última mutación del DOM
+_JS_INSTALAR = """(() => {
+    if (!window.__scrollInfinito) {
+        window.__scrollInfinito = {mutacion: performance.now()};
+        new MutationObserver(() => { window.__scrollInfinito.mutacion = performance.now(); })
+            .observe(document.body, {childList: true, subtree: true});
+        if (performance.setResourceTimingBufferSize) {
+            performance.setResourceTimingBufferSize(100000);
+        }
+    }
+    return true;
+})()"""
+
+# Estado actual: cantidad de productos, ms sin mutaciones y recursos descargados
+_JS_ESTADO = """(() => ({
+    cantidad: %s,
+    quieto_ms: performance.now() - window.__scrollInfinito.mutacion,
+    recursos: performance.getEntriesByType("resource").length
+}))()"""
+
+_JS_BAJAR = "(() => { window.scrollTo(0, document.body.scrollHeight); return true; })()"
+
+
+def _ejecutor(navegador):
+    """Devuelve una función que evalúa una expresión JS en un driver de Selenium o una página de Playwright."""
+    if hasattr(navegador, "execute_script"):
+        return lambda expresion: navegador.execute_script("return " + expresion)
+    return navegador.evaluate
+
+
+def scroll_hasta_el_final(navegador, selector=None, timeout_inicial=10.0, timeout_min=1.5, timeout_max=30.0,
+                          quietud=0.4, intentos_sin_cambio=2, max_scrolls=None, sondeo=0.1, progreso=True):
+    """
+    Hace scroll hasta que el listado deja de cargar productos.
+
+    - navegador: driver de Selenium o página de Playwright.
+    - selector: CSS de cada producto; si es None se usa la altura de la página.
+    - timeout_inicial: espera máxima por scroll hasta conocer el ritmo de la página.
+    - timeout_min / timeout_max: límites de la espera adaptativa.
+    - quietud: segundos sin mutaciones ni recursos nuevos para dar la tanda por cargada.
+    - intentos_sin_cambio: scrolls seguidos sin productos nuevos para terminar.
+    - max_scrolls: tope opcional de scrolls.
+
+    Devuelve la lista de Scroll (uno por scroll realizado).
+    """
+    js = _ejecutor(navegador)
+    contar = f"document.querySelectorAll({json.dumps(selector)}).length" if selector else "document.body.scrollHeight"
+    js_estado = _JS_ESTADO % contar
+
+    js(_JS_INSTALAR)
+    total = js(js_estado)["cantidad"]
+
+    timeout = timeout_inicial
+    demoras = []          # segundos que tardó en aparecer cada tanda nueva
+    scrolls = []
+    sin_cambio = 0
+
+    while max_scrolls is None or len(scrolls) < max_scrolls:
+        js(_JS_BAJAR)
+        inicio = time.monotonic()
+
+        primera_aparicion = None
+        recursos = None
+        recursos_desde = inicio
+        estado = js(js_estado)
+
+        while True:
+            ahora = time.monotonic()
+
+            # Red quieta: la cantidad de recursos no cambió durante `quietud`
+            if estado["recursos"] != recursos:
+                recursos = estado["recursos"]
+                recursos_desde = ahora
+            red_quieta = ahora - recursos_desde >= quietud
+            dom_quieto = estado["quieto_ms"] >= quietud * 1000
+
+            if estado["cantidad"] > total:
+                if primera_aparicion is None:
+                    primera_aparicion = ahora - inicio
+                if red_quieta and dom_quieto:
+                    break
+            if ahora - inicio >= timeout:
+                break
+
+            time.sleep(sondeo)
+            estado = js(js_estado)
+
+        segundos = time.monotonic() - inicio
+        nuevos = max(estado["cantidad"] - total, 0)
+        total = max(estado["cantidad"], total)
+        scrolls.append(Scroll(len(scrolls) + 1, nuevos, total, segundos))
+
+        if progreso:
+            print(f"   Scroll {len(scrolls)}: +{nuevos} ({total} en total) en {segundos:.1f} s")
+
+        if nuevos:
+            sin_cambio = 0
+            # La espera se adapta a lo que tarda la página en traer una tanda
+            demoras.append(primera_aparicion)
+            timeout = min(max(3 * max(demoras[-5:]), timeout_min), timeout_max)
+        else:
+            sin_cambio += 1
+            if sin_cambio >= intentos_sin_cambio:
+                break
+
+    if progreso:
+        espera = sum(s.segundos for s in scrolls)
+        print(f"✔ {len(scrolls)} scrolls, {total} productos, {espera:.1f} s esperando")
+    return scrolls
@@ -1,61 +1,55 @@
-import json
+import sys
 import time
 from playwright.sync_api import sync_playwright
-from bs4 import BeautifulSoup
 
-
-def scrape_sierramora():
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=False)
-        page = browser.new_page(viewport={"width": 1600, "height": 4000})
-
-        page.goto("https://www.sierramorashop.com/shop", wait_until="domcontentloaded")
-        time.sleep(2)
-
-        # Scroll infinito real
-        last_height = 0
-        same = 0
-        while True:
-            new_h = page.evaluate("document.body.scrollHeight")
-            page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+from scraper_base import ScraperBase
+from scroll_infinito import scroll_hasta_el_final
+
+
+class ScraperSierraMora(ScraperBase):
+    """Tienda de Sierra Mora (Playwright + scroll infinito)."""
+
+    MARCA = "Sierra Mora"
+    URL_LISTADO = "https://www.sierramorashop.com/shop"
+    SELECTOR_PRODUCTO = "div.cnt"
+    SALIDA = "productos_sierramora.jsonl"
+    LEGADO = "productos_sierramora.json"
+
+    def obtener_html_listado(self):
+        with sync_playwright() as p:
+            browser = p.chromium.launch(headless=False)
+            page = browser.new_page(viewport={"width": 1600, "height": 4000})
+
+            page.goto(self.URL_LISTADO, wait_until="domcontentloaded")
+            page.wait_for_selector(self.SELECTOR_PRODUCTO)
+
+            # Scroll infinito real (espera a que carguen productos nuevos)
+            scroll_hasta_el_final(page, self.SELECTOR_PRODUCTO)
+
+            # ------------------------------------
+            # FORZAR CARGA DE TODAS LAS IMÁGENES
+            # ------------------------------------
+            page.evaluate("""
+                const imgs = document.querySelectorAll('img');
+                imgs.forEach(img => {
+                    img.loading = 'eager';
+                    if (img.dataset?.src) img.src = img.dataset.src;
+                    if (img.dataset?.srcset) img.srcset = img.dataset.srcset;
+                });
+            """)
             time.sleep(2)
 
-            if new_h == last_height:
-                same += 1
-            else:
-                same = 0
-
-            if same >= 5:
-                break
-
-            last_height = new_h
-
-        # ------------------------------------
-        # FORZAR CARGA DE TODAS LAS IMÁGENES
-        # ------------------------------------
-        page.evaluate("""
-            const imgs = document.querySelectorAll('img');
-            imgs.forEach(img => {
-                img.loading = 'eager';
-                if (img.dataset?.src) img.src = img.dataset.src;
-                if (img.dataset?.srcset) img.srcset = img.dataset.srcset;
-            });
-        """)
-        time.sleep(2)
+            html = page.content()
+            browser.close()
+        return html
 
-        html = page.content()
-        browser.close()
-
-    soup = BeautifulSoup(html, "html.parser")
-    productos = []
-
-    for item in soup.select("div.cnt"):
+    def parsear(self, item):
         nombre_tag = item.select_one("div.info a.tit h2")
         precio_tag = item.select_one("div.info strong.precio span.monto")
         link_tag = item.select_one("a.img")
 
         if not (nombre_tag and precio_tag and link_tag):
-            continue
+            return None
 
         nombre = nombre_tag.get_text(strip=True)
         precio_raw = precio_tag.get_text(strip=True)
@@ -75,33 +69,21 @@ def scrape_sierramora():
             if src:
                 img_url = src
 
-        productos.append({
+        return {
             "nombre": nombre,
             "precio": precio_raw,
             "link": link,
             "imagen": img_url,
-            "marca": "Sierra Mora",
-        })
+            "marca": self.MARCA,
+        }
 
-    with open("productos_sierramora.json", "w", encoding="utf-8") as f:
-        json.dump(productos, f, ensure_ascii=False, indent=2)
 
-    print("✔ Productos scrapeados:", len(productos))
-    return productos
+def scrape_sierramora(reanudar=True, incremental=True):
+    """Scrapea la tienda de Sierra Mora y la guarda en productos_sierramora.jsonl."""
+    return ScraperSierraMora().ejecutar(reanudar=reanudar, incremental=incremental)
 
 
 if __name__ == "__main__":
-    scrape_sierramora()
-
-
-
-
-
-
-
-
-
-
-
-
-
+    # python sierramora_scraper.py --desde-cero  → ignora una corrida anterior cortada
+    # python sierramora_scraper.py --completo    → no compara con la corrida anterior ni guarda el delta
+    scrape_sierramora(reanudar="--desde-cero" not in sys.argv, incremental="--completo" not in sys.argv)
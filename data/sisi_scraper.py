@@ -2,52 +2,53 @@
 # Requisitos:
 # pip install selenium webdriver-manager beautifulsoup4
 
-import json
+import os
+import queue
+import sys
 import time
 import re
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urljoin
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from webdriver_manager.chrome import ChromeDriverManager
-from bs4 import BeautifulSoup
+from parseo_html import nodos_producto, sopa
+from scraper_base import ScraperBase, abrir_chrome
+
+# Descargador con sesiones por host, reintentos y límite de pedidos (../descargas.py)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from descargas import DescargadorPaginas
+from scroll_infinito import scroll_hasta_el_final
+from cambios import cargar_validadores, guardar_validadores
 
 # -------- CONFIG --------
 BASE_LISTING = "https://www.sisi.com.uy/mujer"
 HEADLESS = True                 # False si querés ver el navegador
-SCROLL_ROUNDS = 6               # scroll en la página de listado
-SCROLL_WAIT = 2.0
-PER_PRODUCT_WAIT = 1.5          # espera mínima después de abrir cada producto
-OUTPUT_JSON = "sisi_products.json"
-MAX_PRODUCTS = 50               # <-- límite: cambiá esto al número de productos que querés
+SCROLL_ROUNDS = 40              # scroll en la página de listado (corta antes si no carga más)
+SCROLL_TIMEOUT = 10.0           # espera máxima del primer scroll (después se adapta a la página)
+LISTING_SELECTOR = "a[href*='/catalogo/']"  # un nodo por producto en el listado
+PER_PRODUCT_WAIT = 1.5          # espera mínima después de abrir cada producto (solo navegador)
+OUTPUT_JSONL = "sisi_products.jsonl"   # se escribe producto por producto (ver scraper_base.py)
+MAX_PRODUCTS = None             # None = todo el listado; un número para limitar
+HTTP_WORKERS = 8                # páginas de producto descargadas en paralelo por HTTP
+HTTP_POR_HOST = 4               # conexiones simultáneas contra la tienda
+PEDIDOS_POR_SEGUNDO = 5         # límite de pedidos por segundo a la tienda
+BROWSER_WORKERS = 2             # navegadores de respaldo para páginas que necesitan JS
 # ------------------------
 
 def setup_driver(headless=True):
-    options = Options()
-    if headless:
-        options.add_argument("--headless=new")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-    options.add_argument("--window-size=1920,1080")
-    service = Service(ChromeDriverManager().install())
-    return webdriver.Chrome(service=service, options=options)
-
-def scroll_listing(driver, rounds=6, pause=2.0):
-    last_h = driver.execute_script("return document.body.scrollHeight")
-    for _ in range(rounds):
-        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-        time.sleep(pause)
-        new_h = driver.execute_script("return document.body.scrollHeight")
-        if new_h == last_h:
-            break
-        last_h = new_h
+    return abrir_chrome(headless=headless)
+
+def scroll_listing(driver, rounds=SCROLL_ROUNDS, timeout=SCROLL_TIMEOUT):
+    """Scroll del listado hasta que deja de cargar productos (o hasta `rounds` scrolls)."""
+    return scroll_hasta_el_final(driver, LISTING_SELECTOR, timeout_inicial=timeout, max_scrolls=rounds)
 
 def extract_listing_links(driver):
     """Extrae links y filtra sólo URLs de producto (heurística con '/catalogo/')."""
-    soup = BeautifulSoup(driver.page_source, "html.parser")
+    return extract_links_from_html(driver.page_source)
+
+def extract_links_from_html(html, parser=None, filtrar=True):
+    """Links de producto de un HTML de listado (solo se construyen los <a href>)."""
     links = []
-    for a in soup.select("a[href]"):
+    vistos = set()
+    for a in nodos_producto(html, "a[href]", parser=parser, filtrar=filtrar):
         href = a.get("href")
         if not href:
             continue
@@ -58,7 +59,8 @@ def extract_listing_links(driver):
             href_full = href
         # filtro fuerte: contendrá '/catalogo/' y terminará con _<digits> o con patrón de producto
         if "/catalogo/" in href_full and re.search(r"_\d+$", href_full):
-            if href_full not in links:
+            if href_full not in vistos:
+                vistos.add(href_full)
                 links.append(href_full)
     return links
 
@@ -107,10 +109,9 @@ def normalize_img_url(src):
         return "https://sisi.com.uy" + src
     return src
 
-def parse_product_page(driver, url):
-    driver.get(url)
-    time.sleep(PER_PRODUCT_WAIT)  # esperar cargar JS e imágenes
-    soup = BeautifulSoup(driver.page_source, "html.parser")
+def parse_product_html(html, url, parser=None):
+    """Extrae nombre, precio e imagen del HTML de una página de producto."""
+    soup = sopa(html, parser)
 
     # Nombre: preferir h1, luego og:title, luego title
     nombre = None
@@ -148,44 +149,172 @@ def parse_product_page(driver, url):
         "nombre": nombre or "Sin nombre",
         "precio": (f"${precio}" if precio and not str(precio).strip().startswith("$") else precio) if precio else None,
         "imagen": imagen,
-        "url": url
+        "link": url,
+        "marca": "SiSi"
     }
 
-def main():
-    driver = setup_driver(headless=HEADLESS)
-    try:
-        driver.get(BASE_LISTING)
-        time.sleep(2)
-        scroll_listing(driver, rounds=SCROLL_ROUNDS, pause=SCROLL_WAIT)
-        links = extract_listing_links(driver)
-        # aplicar límite y mantener únicos
-        unique_links = []
-        for l in links:
-            if l not in unique_links:
-                unique_links.append(l)
-            if len(unique_links) >= MAX_PRODUCTS:
-                break
-
-        resultados = []
-        total = len(unique_links)
-        for idx, link in enumerate(unique_links, start=1):
-            # progreso simple
-            print(f"Procesando {idx}/{total} → {link}", end="\r", flush=True)
+def parse_product_page(driver, url):
+    driver.get(url)
+    time.sleep(PER_PRODUCT_WAIT)  # esperar cargar JS e imágenes
+    return parse_product_html(driver.page_source, url)
+
+def needs_browser(item):
+    """La página no trajo el precio en el HTML del servidor: hay que renderizarla con JS."""
+    return not item or not item.get("precio")
+
+def iter_products_http(links, descargador, validadores=None, anteriores=None, nuevos_validadores=None):
+    """
+    Descarga las páginas de producto en paralelo (sin navegador) y las parsea
+    a medida que llegan. Devuelve (link, item) por página; item es None si
+    hay que abrirla con el navegador.
+
+    Con validadores ({ link : (etag, last_modified) }) y anteriores
+    ({ link : producto }) las páginas conocidas se piden de forma condicional:
+    si responden 304 se reutiliza el producto anterior sin parsear nada.
+    Los validadores que devuelve el servidor se guardan en nuevos_validadores.
+    """
+    anteriores = anteriores or {}
+    sin_cambios = 0
+    for respuesta in descargador.descargar_todas(links, validadores):
+        if nuevos_validadores is not None and respuesta.estado in (200, 304) \
+                and (respuesta.etag or respuesta.last_modified):
+            nuevos_validadores[respuesta.url] = (respuesta.etag, respuesta.last_modified)
+
+        if respuesta.estado == 304 and respuesta.url in anteriores:
+            sin_cambios += 1
+            yield respuesta.url, anteriores[respuesta.url]
+            continue
+
+        item = None
+        if respuesta.contenido is not None:
             try:
-                item = parse_product_page(driver, link)
-                resultados.append(item)
-            except Exception as e:
-                # no detener todo por un error en un producto
-                # opcional: loggear en un archivo
-                pass
-
-        # guardar JSON al final
-        with open(OUTPUT_JSON, "w", encoding="utf-8") as f:
-            json.dump(resultados, f, ensure_ascii=False, indent=2)
-
-        print(f"\n✅ Guardados {len(resultados)} productos en {OUTPUT_JSON}")
+                item = parse_product_html(respuesta.contenido, respuesta.url)
+            except Exception:
+                item = None
+
+        yield respuesta.url, (None if needs_browser(item) else item)
+
+    if sin_cambios:
+        print(f"♻ {sin_cambios} páginas sin cambios (304): se reutilizó el producto anterior")
+
+def iter_products_browser(links, workers=BROWSER_WORKERS, crear_driver=None):
+    """
+    Abre con un pool chico de navegadores las páginas que no se pudieron
+    resolver por HTTP. Cada hilo toma un driver libre (o crea uno, hasta
+    `workers`) y lo devuelve al terminar. Devuelve (link, item) por página.
+    """
+    crear_driver = crear_driver or (lambda: setup_driver(headless=HEADLESS))
+    libres = queue.Queue()
+    creados = []
+
+    def procesar(link):
+        try:
+            driver = libres.get_nowait()
+        except queue.Empty:
+            driver = crear_driver()
+            creados.append(driver)
+        try:
+            return link, parse_product_page(driver, link)
+        except Exception:
+            # no detener todo por un error en un producto
+            return link, None
+        finally:
+            libres.put(driver)
+
+    total = len(links)
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for idx, (link, item) in enumerate(pool.map(procesar, links), start=1):
+                print(f"Navegador {idx}/{total} → {link}", end="\r", flush=True)
+                yield link, item
     finally:
-        driver.quit()
+        for driver in creados:
+            driver.quit()
+    if total:
+        print()
+
+def iter_products(links, descargador=None, browser_workers=BROWSER_WORKERS, crear_driver=None,
+                  validadores=None, anteriores=None, nuevos_validadores=None):
+    """
+    Devuelve los productos de todos los links a medida que se obtienen:
+    primero por HTTP en paralelo y, solo para las páginas que lo necesiten,
+    con navegadores de respaldo. validadores / anteriores / nuevos_validadores
+    activan los pedidos condicionales (ver iter_products_http).
+    """
+    propio = descargador is None
+    if propio:
+        descargador = DescargadorPaginas(
+            max_workers=HTTP_WORKERS,
+            por_host=HTTP_POR_HOST,
+            pedidos_por_segundo=PEDIDOS_POR_SEGUNDO
+        )
+
+    pendientes = []
+    try:
+        for link, item in iter_products_http(links, descargador, validadores, anteriores, nuevos_validadores):
+            if item is None:
+                pendientes.append(link)
+            else:
+                yield item
+    finally:
+        if propio:
+            descargador.cerrar()
+
+    if pendientes and browser_workers:
+        print(f"🌐 {len(pendientes)} páginas necesitan navegador")
+        for _, item in iter_products_browser(pendientes, browser_workers, crear_driver):
+            if item:
+                yield item
+
+class ScraperSiSi(ScraperBase):
+    """
+    SiSi: el listado se recorre con el navegador y cada producto se lee
+    de su propia página. Al retomar, solo se piden las páginas que faltan,
+    y las que ya estaban en la corrida anterior se piden de forma
+    condicional (ETag / Last-Modified).
+    """
+
+    MARCA = "SiSi"
+    URL_LISTADO = BASE_LISTING
+    SALIDA = OUTPUT_JSONL
+    LEGADO = "sisi_products.json"
+
+    def iterar_productos(self, ya_guardado):
+        driver = setup_driver(headless=HEADLESS)
+        try:
+            driver.get(self.URL_LISTADO)
+            scroll_listing(driver, rounds=SCROLL_ROUNDS, timeout=SCROLL_TIMEOUT)
+            links = extract_listing_links(driver)
+        finally:
+            # El navegador del listado ya no hace falta: el detalle va por HTTP
+            driver.quit()
+
+        # aplicar límite (los links ya vienen únicos)
+        if MAX_PRODUCTS is not None:
+            links = links[:MAX_PRODUCTS]
+
+        faltan = [l for l in links if not ya_guardado(l)]
+        print(f"🔗 {len(links)} productos en el listado ({len(faltan)} por descargar)")
+
+        # Validadores de la corrida anterior, solo de productos que se pueden reutilizar
+        validadores = cargar_validadores(self.MARCA)
+        condicionales = {l: validadores[l] for l in faltan if l in validadores and l in self.anteriores}
+        nuevos = {}
+        yield from iter_products(faltan, validadores=condicionales, anteriores=self.anteriores,
+                                 nuevos_validadores=nuevos)
+
+        # Se conservan los de productos guardados antes de un corte y se olvidan los que ya no están
+        en_listado = set(links)
+        validadores.update(nuevos)
+        guardar_validadores(self.MARCA, {l: v for l, v in validadores.items() if l in en_listado})
+
+def main(reanudar=True, incremental=True):
+    inicio = time.perf_counter()
+    total = ScraperSiSi().ejecutar(reanudar=reanudar, incremental=incremental)
+    print(f"⏱ {time.perf_counter() - inicio:.1f} s")
+    return total
 
 if __name__ == "__main__":
-    main()
+    # python sisi_scraper.py --desde-cero  → ignora una corrida anterior cortada
+    # python sisi_scraper.py --completo    → vuelve a bajar todas las páginas y no guarda el delta
+    main(reanudar="--desde-cero" not in sys.argv, incremental="--completo" not in sys.argv)
@@ -0,0 +1,202 @@
+"""
+descargas.py
+
+Descarga concurrente de imágenes de productos (y de páginas HTML, ver
+DescargadorPaginas, que usan los scrapers de data/).
+
+En lugar de hacer un requests.get por imagen (sin keep-alive y de a una),
+usamos:
+- un requests.Session por host con su propio pool de conexiones,
+- reintentos con espera exponencial (backoff) para errores transitorios,
+- un ThreadPoolExecutor con concurrencia acotada (global y por host),
+- opcionalmente, un límite de pedidos por segundo a cada host,
+- un reporte de progreso simple en consola.
+
+Las URLs pueden apuntar a cualquier servidor HTTP, así que para probar
+alcanza con levantar un servidor local que sirva imágenes de ejemplo.
+"""
+
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Resultado de una descarga. estado es el código HTTP (None si hubo error de red);
+# contenido solo viene con 200; etag y last_modified sirven para pedidos condicionales.
+Respuesta = namedtuple("Respuesta", ["url", "estado", "contenido", "etag", "last_modified"])
+
+
+class DescargadorImagenes:
+    """
+    Descarga muchas URLs en paralelo reutilizando conexiones por host.
+
+    - max_workers: cantidad total de descargas simultáneas.
+    - por_host: máximo de descargas simultáneas contra un mismo host.
+    - reintentos / backoff: política de reintentos ante fallas o 429/5xx.
+    - pedidos_por_segundo: máximo de pedidos por segundo a un mismo host
+      (None = sin límite, solo la concurrencia).
+    """
+
+    # Qué se descarga, para el mensaje de progreso
+    DESCRIPCION = "imágenes"
+
+    def __init__(self, max_workers=16, por_host=8, timeout=8, reintentos=3, backoff=0.5,
+                 pedidos_por_segundo=None):
+        self.max_workers = max_workers
+        self.por_host = por_host
+        self.timeout = timeout
+        self.reintentos = reintentos
+        self.backoff = backoff
+        self.pedidos_por_segundo = pedidos_por_segundo
+
+        self._sesiones = {}
+        self._limites = {}
+        self._turnos = {}    # host → [lock, momento del próximo pedido permitido]
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------
+    #   Sesión y semáforo por host
+    # ------------------------------------------------------
+    def _nueva_sesion(self):
+        """Crea una sesión con pool de conexiones y reintentos con backoff."""
+        retry = Retry(
+            total=self.reintentos,
+            backoff_factor=self.backoff,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=("GET",),
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.por_host, max_retries=retry)
+
+        sesion = requests.Session()
+        sesion.mount("http://", adapter)
+        sesion.mount("https://", adapter)
+        return sesion
+
+    def _recursos_host(self, url):
+        """Devuelve (sesión, semáforo) del host de la URL, creándolos si hace falta."""
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._sesiones:
+                self._sesiones[host] = self._nueva_sesion()
+                self._limites[host] = threading.BoundedSemaphore(self.por_host)
+                self._turnos[host] = [threading.Lock(), 0.0]
+            return self._sesiones[host], self._limites[host]
+
+    def _esperar_turno(self, url):
+        """Si hay límite de pedidos por segundo, espera hasta que el host tenga turno libre."""
+        if not self.pedidos_por_segundo:
+            return
+
+        with self._lock:
+            turno = self._turnos[urlsplit(url).netloc]
+
+        # Cada pedido reserva el siguiente hueco y duerme fuera del lock
+        with turno[0]:
+            ahora = time.monotonic()
+            momento = max(ahora, turno[1])
+            turno[1] = momento + 1.0 / self.pedidos_por_segundo
+        if momento > ahora:
+            time.sleep(momento - ahora)
+
+    # ------------------------------------------------------
+    #   Descargas
+    # ------------------------------------------------------
+    def descargar(self, url, etag=None, last_modified=None):
+        """
+        Descarga una URL y devuelve una Respuesta.
+        Si se pasan etag / last_modified se hace un pedido condicional:
+        el servidor responde 304 (sin contenido) si la imagen no cambió.
+        """
+        encabezados = {}
+        if etag:
+            encabezados["If-None-Match"] = etag
+        if last_modified:
+            encabezados["If-Modified-Since"] = last_modified
+
+        try:
+            sesion, limite = self._recursos_host(url)
+            with limite:
+                self._esperar_turno(url)
+                r = sesion.get(url, headers=encabezados, timeout=self.timeout)
+                r.raise_for_status()
+        except Exception:
+            return Respuesta(url, None, None, None, None)
+
+        contenido = r.content if r.status_code == 200 else None
+        return Respuesta(
+            url,
+            r.status_code,
+            contenido,
+            r.headers.get("ETag", etag),
+            r.headers.get("Last-Modified", last_modified),
+        )
+
+    def descargar_bytes(self, url):
+        """Descarga una URL y devuelve su contenido en bytes, o None si falla."""
+        return self.descargar(url).contenido
+
+    def descargar_todas(self, urls, validadores=None, progreso=True):
+        """
+        Descarga todas las URLs en paralelo.
+        Es un generador: va devolviendo una Respuesta por URL a medida que
+        terminan, así el hashing puede empezar sin esperar al resto.
+
+        validadores: { url : (etag, last_modified) } opcional para hacer
+        pedidos condicionales de las URLs ya conocidas.
+        """
+        validadores = validadores or {}
+        urls = list(dict.fromkeys(u for u in urls if u))  # únicas, sin vacías
+        total = len(urls)
+        if not total:
+            return
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futuros = [
+                pool.submit(self.descargar, u, *validadores.get(u, (None, None)))
+                for u in urls
+            ]
+            fallidas = 0
+
+            for hechas, futuro in enumerate(as_completed(futuros), start=1):
+                respuesta = futuro.result()
+                if respuesta.estado is None:
+                    fallidas += 1
+
+                if progreso:
+                    print(f"Descargando {self.DESCRIPCION} {hechas}/{total} (fallidas: {fallidas})", end="\r", flush=True)
+
+                yield respuesta
+
+        if progreso:
+            print()
+
+    def cerrar(self):
+        """Cierra todas las sesiones abiertas."""
+        with self._lock:
+            for sesion in self._sesiones.values():
+                sesion.close()
+            self._sesiones.clear()
+            self._limites.clear()
+            self._turnos.clear()
+
+
+class DescargadorPaginas(DescargadorImagenes):
+    """
+    Mismo descargador, pensado para páginas HTML de producto: por defecto
+    con menos concurrencia y un límite de pedidos por segundo por host,
+    para no saturar las tiendas. El contenido viene en bytes; BeautifulSoup
+    detecta la codificación a partir de la página.
+    """
+
+    DESCRIPCION = "páginas"
+
+    def __init__(self, max_workers=8, por_host=4, timeout=15, reintentos=3, backoff=1.0,
+                 pedidos_por_segundo=5):
+        super().__init__(max_workers=max_workers, por_host=por_host, timeout=timeout,
+                         reintentos=reintentos, backoff=backoff,
+                         pedidos_por_segundo=pedidos_por_segundo)
@@ -0,0 +1,169 @@
+"""
+indice_binario.py
+
+Formato binario compacto para el índice de pHashes.
+
+En vez de un JSON con los productos repetidos bajo cada hash, se guardan
+dos archivos:
+
+1. Archivo de índice (.bin):
+       [cabecera][phash uint64 x N][dhash uint64 x N][whash uint64 x N]
+       [offsets uint64 x (N + 1)][color float32 x N x CASILLEROS_COLOR]
+   - cabecera: magic, versión, N, generación y tamaño de la tabla de productos.
+   - phash[i], dhash[i], whash[i]: hashes de la imagen de la fila i.
+   - offsets[i]..offsets[i + 1]: bytes de la fila i en la tabla de productos.
+   - color[i]: histograma de color normalizado de la fila i.
+
+2. Tabla de productos (.jsonl): un producto por línea en JSON.
+
+Ambos se abren con mmap (los arreglos son vistas NumPy sobre el archivo), así que cargar el índice no parsea
+nada: el sistema operativo pagina los datos a demanda y los comparte entre
+procesos a través del page cache. Solo se decodifican los productos que
+efectivamente se muestran como resultado.
+"""
+
+import json
+import mmap
+import os
+import struct
+import tempfile
+import time
+
+import numpy as np
+
+# Rutas por defecto (junto a la caché de pHashes)
+INDICE_FILE = os.path.join(tempfile.gettempdir(), "product_image_phashes.bin")
+METADATA_FILE = os.path.join(tempfile.gettempdir(), "product_image_phashes.jsonl")
+
+# Cabecera: magic, versión, cantidad de filas, generación, tamaño de la tabla
+MAGIC = b"PHIX"
+VERSION = 2
+CABECERA = struct.Struct("<4sIQQQ")
+
+# Casilleros del histograma de color (4 niveles por canal RGB)
+CASILLEROS_COLOR = 64
+
+
+class IndiceBinario:
+    """
+    Índice de pHashes cargado desde disco con memory-mapping.
+
+    - hashes: arreglo uint64 con el pHash (una fila por producto).
+    - dhash / whash: arreglos uint64 con los otros hashes de la misma fila.
+    - color: matriz float32 (N x CASILLEROS_COLOR) con los histogramas.
+    - generacion: identificador de la construcción; cambia con cada escritura
+      y sirve para saber si otras estructuras (como el BK-tree) están al día.
+    """
+
+    def __init__(self, hashes, offsets, metadata, generacion, dhash=None, whash=None, color=None):
+        self.hashes = hashes
+        self.dhash = dhash
+        self.whash = whash
+        self.color = color
+        self.offsets = offsets
+        self.generacion = generacion
+        self._metadata = metadata
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def producto(self, fila):
+        """Decodifica y devuelve el diccionario del producto de una fila."""
+        inicio = int(self.offsets[fila])
+        fin = int(self.offsets[fila + 1])
+        return json.loads(self._metadata[inicio:fin])
+
+
+def _escribir_atomico(ruta, partes):
+    """Escribe un archivo en un temporal y lo renombra, para no dejarlo a medias."""
+    carpeta = os.path.dirname(ruta) or "."
+    fd, tmp = tempfile.mkstemp(dir=carpeta)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for parte in partes:
+                f.write(parte)
+        os.replace(tmp, ruta)
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def escribir_indice_binario(hashes, productos, ruta=INDICE_FILE, ruta_metadata=METADATA_FILE,
+                            dhash=None, whash=None, color=None):
+    """
+    Guarda `hashes` (pHash uint64, uno por fila) y `productos` (lista de dicts,
+    mismo orden) en el formato binario, junto con los descriptores opcionales
+    dhash / whash (uint64) y color (N x CASILLEROS_COLOR). Los que falten se
+    guardan en cero. Devuelve la generación escrita.
+    """
+    cantidad = len(productos)
+    lineas = [json.dumps(p, ensure_ascii=False).encode("utf-8") + b"\n" for p in productos]
+
+    offsets = np.zeros(cantidad + 1, dtype="<u8")
+    np.cumsum([len(linea) for linea in lineas], out=offsets[1:])
+
+    def _arreglo(valores, dtype, forma):
+        if valores is None:
+            return np.zeros(forma, dtype=dtype)
+        return np.asarray(valores, dtype=dtype).reshape(forma)
+
+    generacion = time.time_ns()
+    cabecera = CABECERA.pack(MAGIC, VERSION, cantidad, generacion, int(offsets[-1]))
+
+    # Primero la tabla de productos y después el índice que la referencia
+    _escribir_atomico(ruta_metadata, lineas)
+    _escribir_atomico(ruta, [
+        cabecera,
+        _arreglo(hashes, "<u8", (cantidad,)).tobytes(),
+        _arreglo(dhash, "<u8", (cantidad,)).tobytes(),
+        _arreglo(whash, "<u8", (cantidad,)).tobytes(),
+        offsets.tobytes(),
+        _arreglo(color, "<f4", (cantidad, CASILLEROS_COLOR)).tobytes(),
+    ])
+    return generacion
+
+
+def _tamano_esperado(cantidad):
+    """Tamaño en bytes del archivo .bin para `cantidad` filas."""
+    return CABECERA.size + 8 * (4 * cantidad + 1) + 4 * CASILLEROS_COLOR * cantidad
+
+
+def cargar_indice_binario(ruta=INDICE_FILE, ruta_metadata=METADATA_FILE):
+    """
+    Abre el índice binario con memory-mapping.
+    Devuelve un IndiceBinario, o None si no existe, es de otra versión
+    o no coincide con la tabla de productos.
+    """
+    try:
+        # Un solo mmap del .bin: cabecera y secciones salen del mismo archivo
+        # abierto, aunque otro proceso lo reemplace (os.replace) mientras tanto
+        with open(ruta, "rb") as f:
+            datos = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, cantidad, generacion, tamano = CABECERA.unpack_from(datos, 0)
+        if magic != MAGIC or version != VERSION:
+            return None
+        if len(datos) != _tamano_esperado(cantidad):
+            return None
+        if os.path.getsize(ruta_metadata) != tamano:
+            return None
+
+        def _mapear(posicion, dtype, forma):
+            return np.frombuffer(datos, dtype=dtype, count=int(np.prod(forma)), offset=posicion).reshape(forma)
+
+        inicio = CABECERA.size
+        hashes = _mapear(inicio, "<u8", (cantidad,))
+        dhash = _mapear(inicio + 8 * cantidad, "<u8", (cantidad,))
+        whash = _mapear(inicio + 16 * cantidad, "<u8", (cantidad,))
+        offsets = _mapear(inicio + 24 * cantidad, "<u8", (cantidad + 1,))
+        color = _mapear(inicio + 8 * (4 * cantidad + 1), "<f4", (cantidad, CASILLEROS_COLOR))
+
+        if tamano:
+            with open(ruta_metadata, "rb") as f:
+                metadata = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            metadata = b""
+
+        return IndiceBinario(hashes, offsets, metadata, generacion, dhash=dhash, whash=whash, color=color)
+    except Exception:
+        return None
@@ -0,0 +1,153 @@
+"""
+indice_bktree.py
+
+Índice métrico (BK-tree) sobre pHashes de 64 bits.
+
+Un BK-tree organiza los hashes según su distancia de Hamming: cada hijo
+cuelga de su padre en la "rama" igual a la distancia entre ambos. Por la
+desigualdad triangular, al buscar con un radio r solo hace falta bajar por
+las ramas cuya distancia esté entre (d - r) y (d + r), así que la mayor
+parte del catálogo se descarta sin compararse.
+
+Ofrece dos consultas:
+- buscar_radio(hash, radio): todos los hashes a distancia <= radio.
+- buscar_knn(hash, k): los k hashes más cercanos.
+
+Cada nodo guarda las filas del índice (ver indice_binario.py) que tienen
+ese hash, así el resultado apunta directo a los productos.
+"""
+
+import heapq
+
+
+def _a_entero(ph):
+    """Convierte un hash (string hexadecimal u objeto imagehash) a entero."""
+    return int(str(ph), 16)
+
+
+def _distancia(a, b):
+    """Distancia de Hamming entre dos enteros de 64 bits."""
+    return (a ^ b).bit_count()
+
+
+class BKTree:
+    """
+    Árbol BK de pHashes.
+
+    Cada nodo es una lista [valor_entero, filas, hijos], donde `filas` son
+    las filas del índice con ese hash e `hijos` es un diccionario
+    { distancia : nodo }. Se usan listas en lugar de objetos para que el
+    árbol sea liviano.
+
+    `generacion` identifica el índice a partir del cual se construyó.
+    """
+
+    def __init__(self, generacion=None):
+        self.raiz = None
+        self.cantidad = 0
+        self.generacion = generacion
+
+    def agregar(self, ph, fila):
+        """Inserta un hash con su fila; si el hash ya existe, suma la fila al nodo."""
+        valor = ph if isinstance(ph, int) else _a_entero(ph)
+
+        if self.raiz is None:
+            self.raiz = [valor, [fila], {}]
+            self.cantidad = 1
+            return
+
+        nodo = self.raiz
+        while True:
+            d = _distancia(valor, nodo[0])
+            if d == 0:
+                nodo[1].append(fila)
+                return
+
+            hijo = nodo[2].get(d)
+            if hijo is None:
+                nodo[2][d] = [valor, [fila], {}]
+                self.cantidad += 1
+                return
+            nodo = hijo
+
+    def buscar_radio(self, ph, radio):
+        """
+        Devuelve lista de (distancia, filas) con todos los hashes a
+        distancia <= radio, ordenada de menor a mayor distancia.
+        """
+        if self.raiz is None:
+            return []
+
+        valor = _a_entero(ph)
+        encontrados = []
+        pila = [self.raiz]
+
+        while pila:
+            nodo = pila.pop()
+            d = _distancia(valor, nodo[0])
+            if d <= radio:
+                encontrados.append((d, nodo[1]))
+
+            # Solo bajamos por las ramas que pueden contener resultados
+            for dist_hijo, hijo in nodo[2].items():
+                if d - radio <= dist_hijo <= d + radio:
+                    pila.append(hijo)
+
+        encontrados.sort(key=lambda x: x[0])
+        return encontrados
+
+    def buscar_knn(self, ph, k):
+        """
+        Devuelve lista de (distancia, filas) con los k hashes más
+        cercanos, ordenada de menor a mayor distancia.
+
+        El radio de búsqueda arranca en 64 (todo) y se achica a medida que
+        encontramos k candidatos, lo que poda cada vez más ramas.
+        """
+        if self.raiz is None or k <= 0:
+            return []
+
+        valor = _a_entero(ph)
+        mejores = []  # heap de máximo simulado con (-distancia, orden, filas)
+        pila = [self.raiz]
+        orden = 0
+
+        while pila:
+            nodo = pila.pop()
+            d = _distancia(valor, nodo[0])
+            orden += 1
+
+            if len(mejores) < k:
+                heapq.heappush(mejores, (-d, orden, nodo[1]))
+            elif d < -mejores[0][0]:
+                heapq.heapreplace(mejores, (-d, orden, nodo[1]))
+
+            radio = -mejores[0][0] if len(mejores) == k else 64
+            for dist_hijo, hijo in nodo[2].items():
+                if d - radio <= dist_hijo <= d + radio:
+                    pila.append(hijo)
+
+        mejores.sort(key=lambda x: (-x[0], x[1]))
+        return [(-d, filas) for d, _, filas in mejores]
+
+
+# ==========================================================
+#                CONSTRUCCIÓN DEL ÁRBOL
+# ==========================================================
+def construir_bktree(indice):
+    """Arma un BK-tree con los hashes de un IndiceBinario (fila = posición)."""
+    arbol = BKTree(generacion=indice.generacion)
+    for fila, valor in enumerate(indice.hashes.tolist()):
+        arbol.agregar(valor, fila)
+    return arbol
+
+
+def obtener_bktree(indice):
+    """
+    Devuelve el BK-tree del índice, armado en memoria a partir del memmap.
+
+    No se guarda en disco: construirlo lleva menos de un segundo para
+    100.000 hashes, y leerlo con pickle desde una carpeta compartida como
+    /tmp permitiría ejecutar código plantado por otro usuario.
+    """
+    return construir_bktree(indice)
@@ -1,3 +1,6 @@
+import sys
+
+
 # ==========================================================
 #                CLASE BASE DE PRODUCTO
 # ==========================================================
@@ -6,13 +9,20 @@ class Producto:
     Representa un producto genérico de cualquier tienda/marca.
     Esta clase es la base para las subclases específicas (SISI,
     Rotunda, Sierramora), lo que permite usar herencia y polimorfismo.
+
+    Usa __slots__: cada instancia guarda solo estos cinco campos, sin el
+    diccionario __dict__ que Python crea por defecto. Con catálogos de
+    cientos de miles de productos, esto reduce bastante la memoria.
     """
 
+    __slots__ = ("nombre", "precio", "link", "imagen", "marca")
+
     def __init__(self, nombre, precio, link, imagen, marca):
         # Nombre del producto
         self.nombre = nombre
 
         # Precio ya viene normalizado/limpio desde cargar_productos.py
+        # (entero, o float solo si tiene centavos: ocupa menos que un string con formato)
         self.precio = precio
 
         # Enlace a la página del producto
@@ -21,8 +31,9 @@ class Producto:
         # URL de la imagen del producto
         self.imagen = imagen
 
-        # Marca original del producto
-        self.marca = marca
+        # Marca original del producto. La "internamos" para que todos los
+        # productos de la misma marca compartan un único string en memoria
+        self.marca = sys.intern(marca) if isinstance(marca, str) else marca
 
     def mostrar_info(self):
         """
@@ -54,6 +65,8 @@ class ProductoSiSi(Producto):
     Representa un producto específico de la marca SISI.
     Puede tener métodos propios si en el futuro se necesitan.
     """
+    __slots__ = ()
+
     def tipo(self):
         return "Lencería (SISI)"
 
@@ -64,6 +77,8 @@ class ProductoRotunda(Producto):
     Permite diferenciar comportamientos si en el futuro
     la marca requiere lógica especial.
     """
+    __slots__ = ()
+
     def tipo(self):
         return "Ropa (Rotunda)"
 
@@ -74,6 +89,8 @@ class ProductoSierramora(Producto):
     Usa herencia para mantener atributos y métodos de Producto,
     pero permite extender comportamiento.
     """
+    __slots__ = ()
+
     def tipo(self):
         return "Ropa (Sierramora)"
 
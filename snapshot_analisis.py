@@ -0,0 +1,78 @@
+"""
+snapshot_analisis.py
+
+Foto ("snapshot") precalculada de las estadísticas del panel de análisis.
+
+Las estadísticas solo cambian cuando cambia el catálogo, así que se
+calculan una vez por generación del CatalogoVivo (catalogo_vivo.py) y se
+sirven tal cual. Se calculan sobre los mismos productos que ya cargó el
+catálogo (pasados a columnas, ver catalogo_columnar.py) y con el reporte
+de validación de esa misma carga: no se vuelve a leer data/.
+
+La foto vive solo en memoria. Si el cálculo falla, se avisa por consola
+y se sigue sirviendo la foto anterior.
+"""
+
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from agregaciones import calcular_panel
+from cargar_productos import ReporteValidacion
+from catalogo_columnar import CatalogoColumnar
+
+
+def _panel_vacio():
+    """Panel de un catálogo sin productos (mientras no haya ninguna foto calculada)."""
+    panel = calcular_panel([])
+    panel["validacion"] = ReporteValidacion().resumen()
+    return panel
+
+
+class SnapshotAnalisis:
+    """
+    Estadísticas del panel calculadas una vez por generación del catálogo.
+
+    - catalogo: CatalogoVivo del que se toman los productos y el reporte
+      de validación (ver CatalogoVivo.publicado).
+    """
+
+    def __init__(self, catalogo):
+        self.catalogo = catalogo
+
+        self._generacion = None
+        self._panel = None
+        self._lock = threading.Lock()
+
+    @property
+    def generacion(self):
+        """Generación del catálogo con la que se calculó la foto actual."""
+        return self._generacion
+
+    def obtener(self):
+        """Devuelve las estadísticas del panel, recalculándolas solo si cambió el catálogo."""
+        generacion, productos, reporte = self.catalogo.publicado
+        if generacion == self._generacion:
+            return self._panel
+
+        with self._lock:
+            # Otro hilo pudo haberla recalculado mientras esperábamos
+            if generacion != self._generacion:
+                try:
+                    # Las métricas se calculan vectorizadas sobre las columnas
+                    panel = calcular_panel(CatalogoColumnar.desde_productos(productos))
+                    panel["validacion"] = reporte.resumen()
+                except Exception as e:
+                    # Se sigue con la foto anterior; se reintenta con la próxima generación
+                    print(f"⚠ No se pudo calcular el panel de análisis: {e}")
+                    panel = self._panel if self._panel is not None else _panel_vacio()
+                self._panel, self._generacion = panel, generacion
+            return self._panel
+
+    def invalidar(self):
+        """Descarta la foto en memoria; la próxima consulta la vuelve a calcular."""
+        with self._lock:
+            self._generacion = None
+            self._panel = None
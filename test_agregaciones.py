@@ -0,0 +1,110 @@
+"""
+test_agregaciones.py
+
+Verifica que el motor de agregación (agregaciones.py), tanto recorriendo
+productos como sobre el catálogo en columnas (catalogo_columnar.py), dé
+los mismos resultados que las funciones de analisis_productos.py.
+
+Ejecuta: python -m pytest test_agregaciones.py
+"""
+
+import pytest
+
+from agregaciones import (
+    Conteo, Maximo, Minimo, MotorAgregacion, Percentiles, Promedio, Suma, TopK, calcular_panel
+)
+from analisis_productos import (
+    precio_promedio_por_marca, productos_por_marca, top_5_productos_mas_caros
+)
+from catalogo_columnar import CatalogoColumnar
+from producto import Producto
+
+
+def _producto(nombre, precio, marca, link=None):
+    return Producto(nombre, precio, link if link is not None else f"https://tienda/{nombre}", "", marca)
+
+
+def _claves(productos):
+    """Los productos del panel se comparan por sus datos (el catálogo en columnas crea objetos nuevos)."""
+    return [(p.nombre, p.precio, p.link, p.marca) for p in productos]
+
+
+CATALOGOS = {
+    "vacio": [],
+    "un_producto": [_producto("a", 100, "SiSi")],
+    "empates_de_precio": [
+        _producto("a", 500, "SiSi"), _producto("b", 900, "Rotunda"), _producto("c", 500, "SiSi"),
+        _producto("d", 900, "Sierra Mora"), _producto("e", 500, "Rotunda"), _producto("f", 900, "SiSi"),
+        _producto("g", 100, "SiSi"), _producto("h", 500, "Sierra Mora"),
+    ],
+    "marcas_vacias_y_precios_cero": [
+        _producto("a", 0, ""), _producto("b", 1290, "SiSi"), _producto("c", 0, "SiSi"),
+        _producto("d", 750, None), _producto("e", 0, "Desconocida"), _producto("f", 1290, ""),
+        _producto("", 300, "Rotunda", link=""),
+    ],
+    "precios_con_centavos": [
+        _producto("a", 1290.5, "SiSi"), _producto("b", 1290, "SiSi"), _producto("c", 12.5, "Rotunda"),
+        _producto("d", 1290.5, "Rotunda"), _producto("e", 0.99, "SiSi"), _producto("f", 1291, ""),
+    ],
+}
+
+
+@pytest.fixture(params=sorted(CATALOGOS))
+def productos(request):
+    return CATALOGOS[request.param]
+
+
+@pytest.fixture(params=["lista", "columnar"])
+def fuente(request, productos):
+    """Los mismos productos como lista de objetos o como catálogo en columnas."""
+    if request.param == "lista":
+        return productos
+    return CatalogoColumnar.desde_productos(productos)
+
+
+def test_conteo_por_marca(productos, fuente):
+    assert calcular_panel(fuente)["conteo_marcas"] == productos_por_marca(productos)
+
+
+def test_promedio_por_marca(productos, fuente):
+    assert calcular_panel(fuente)["promedios"] == precio_promedio_por_marca(productos)
+
+
+def test_top_5_con_empates(productos, fuente):
+    assert _claves(calcular_panel(fuente)["top_5"]) == _claves(top_5_productos_mas_caros(productos))
+
+
+def test_total_de_productos(productos, fuente):
+    assert calcular_panel(fuente)["total_productos"] == len(productos)
+
+
+def test_columnar_igual_que_recorrer_productos(productos):
+    metricas = {
+        "suma": Suma("precio", por="marca"),
+        "minimo": Minimo("precio", por="marca"),
+        "maximo": Maximo("precio", por="marca"),
+        "percentiles": Percentiles("precio", (10, 50, 90), por="marca"),
+        "minimo_global": Minimo("precio"),
+        "promedio_global": Promedio("precio"),
+        "top_por_marca": TopK(2, "precio", por="marca", vacio="Desconocida"),
+        "conteo_por_nombre": Conteo(por="nombre", vacio="(sin nombre)"),
+    }
+    motor = MotorAgregacion(metricas)
+    por_productos = motor.calcular(productos)
+    por_columnas = motor.calcular(CatalogoColumnar.desde_productos(productos))
+
+    assert list(por_columnas) == list(metricas)
+    for nombre in metricas:
+        if nombre == "top_por_marca":
+            assert ({m: _claves(l) for m, l in por_columnas[nombre].items()}
+                    == {m: _claves(l) for m, l in por_productos[nombre].items()})
+        else:
+            assert por_columnas[nombre] == por_productos[nombre], nombre
+
+
+def test_metricas_con_funciones_recorren_el_catalogo_en_columnas():
+    """Las métricas definidas con funciones (no columnas) también funcionan sobre el catálogo en columnas."""
+    productos = CATALOGOS["marcas_vacias_y_precios_cero"]
+    metricas = {"caros": Conteo(por=lambda p: p.precio > 500)}
+    esperado = MotorAgregacion(metricas).calcular(productos)
+    assert MotorAgregacion(metricas).calcular(CatalogoColumnar.desde_productos(productos)) == esperado
@@ -0,0 +1,211 @@
+"""
+test_descargas.py
+
+Prueba DescargadorImagenes / DescargadorPaginas (descargas.py) contra un
+servidor HTTP local levantado en un hilo: conexiones reutilizadas, límite
+por host, reintentos ante 5xx / 429, pedidos condicionales (304) y
+timeouts.
+
+Ejecuta: python -m pytest test_descargas.py
+"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from descargas import DescargadorImagenes, DescargadorPaginas
+
+CONTENIDO = b"\x89PNG imagen de prueba"
+ETAG = '"v1"'
+LAST_MODIFIED = "Wed, 01 Jan 2025 00:00:00 GMT"
+
+
+class _Manejador(BaseHTTPRequestHandler):
+    """
+    Rutas de prueba:
+    - /imagen/<n>        → 200 con ETag y Last-Modified (304 si el pedido es condicional y coincide)
+    - /lenta/<n>         → 200 después de `server.demora` segundos
+    - /falla/<codigo>/<n> → responde <codigo> las primeras `server.fallas` veces y después 200
+    """
+
+    protocol_version = "HTTP/1.1"  # keep-alive, para ver si se reutilizan las conexiones
+
+    def log_message(self, *args):
+        pass
+
+    def _responder(self, codigo, cuerpo=b"", encabezados=None):
+        self.send_response(codigo)
+        for clave, valor in (encabezados or {}).items():
+            self.send_header(clave, valor)
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def do_GET(self):
+        servidor = self.server
+        with servidor.lock:
+            servidor.pedidos.append(self.path)
+            servidor.puertos.add(self.client_address[1])
+            servidor.activos += 1
+            servidor.max_activos = max(servidor.max_activos, servidor.activos)
+            intento = servidor.intentos[self.path] = servidor.intentos.get(self.path, 0) + 1
+        try:
+            partes = self.path.strip("/").split("/")
+            if partes[0] == "lenta":
+                time.sleep(servidor.demora)
+                self._responder(200, CONTENIDO)
+            elif partes[0] == "falla" and intento <= servidor.fallas:
+                self._responder(int(partes[1]))
+            elif partes[0] == "imagen" and (self.headers.get("If-None-Match") == ETAG
+                                            or self.headers.get("If-Modified-Since") == LAST_MODIFIED):
+                self._responder(304, encabezados={"ETag": ETAG})
+            else:
+                self._responder(200, CONTENIDO, {"ETag": ETAG, "Last-Modified": LAST_MODIFIED})
+        finally:
+            with servidor.lock:
+                servidor.activos -= 1
+
+
+class _Servidor(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass  # el cliente cortó antes (prueba de timeout): no hay a quién responder
+
+
+@pytest.fixture
+def servidor():
+    """Servidor HTTP local en un puerto libre; devuelve (servidor, url_base)."""
+    srv = _Servidor(("127.0.0.1", 0), _Manejador)
+    srv.lock = threading.Lock()
+    srv.pedidos = []
+    srv.puertos = set()
+    srv.intentos = {}
+    srv.activos = srv.max_activos = 0
+    srv.demora = 0.1
+    srv.fallas = 2
+
+    hilo = threading.Thread(target=srv.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    hilo.start()
+    yield srv, f"http://127.0.0.1:{srv.server_address[1]}"
+    srv.shutdown()
+    srv.server_close()
+
+
+def _descargar_todas(descargador, urls, validadores=None):
+    try:
+        return {r.url: r for r in descargador.descargar_todas(urls, validadores, progreso=False)}
+    finally:
+        descargador.cerrar()
+
+
+def test_reutiliza_conexiones_del_pool(servidor):
+    srv, base = servidor
+    urls = [f"{base}/imagen/{i}" for i in range(40)]
+
+    respuestas = _descargar_todas(DescargadorImagenes(max_workers=4, por_host=4), urls)
+
+    assert sorted(respuestas) == sorted(urls)
+    assert all(r.estado == 200 and r.contenido == CONTENIDO for r in respuestas.values())
+    # 40 pedidos por, como mucho, una conexión por lugar del pool
+    assert len(srv.puertos) <= 4
+
+
+def test_respeta_el_limite_por_host(servidor):
+    srv, base = servidor
+    urls = [f"{base}/lenta/{i}" for i in range(8)]
+
+    respuestas = _descargar_todas(DescargadorImagenes(max_workers=8, por_host=2), urls)
+
+    assert all(r.estado == 200 for r in respuestas.values())
+    assert srv.max_activos == 2
+
+
+def test_descarta_urls_repetidas_y_vacias(servidor):
+    srv, base = servidor
+    url = f"{base}/imagen/1"
+
+    descargador = DescargadorPaginas(pedidos_por_segundo=None)
+    respuestas = list(descargador.descargar_todas([url, "", url], progreso=False))
+    descargador.cerrar()
+
+    assert [r.url for r in respuestas] == [url]
+    assert srv.pedidos == ["/imagen/1"]
+
+
+@pytest.mark.parametrize("codigo", [500, 503, 429])
+def test_reintenta_errores_transitorios(servidor, codigo):
+    srv, base = servidor
+    descargador = DescargadorImagenes(reintentos=3, backoff=0)
+
+    respuesta = descargador.descargar(f"{base}/falla/{codigo}/x")
+    descargador.cerrar()
+
+    assert respuesta.estado == 200 and respuesta.contenido == CONTENIDO
+    assert srv.intentos[f"/falla/{codigo}/x"] == srv.fallas + 1
+
+
+def test_sin_reintentos_suficientes_devuelve_error(servidor):
+    srv, base = servidor
+    descargador = DescargadorImagenes(reintentos=1, backoff=0)
+
+    respuesta = descargador.descargar(f"{base}/falla/503/x")
+    descargador.cerrar()
+
+    assert respuesta.estado is None and respuesta.contenido is None
+
+
+def test_pedido_condicional_responde_304(servidor):
+    _, base = servidor
+    url = f"{base}/imagen/1"
+    descargador = DescargadorImagenes()
+
+    primera = descargador.descargar(url)
+    por_etag = descargador.descargar(url, etag=primera.etag)
+    por_fecha = descargador.descargar(url, last_modified=primera.last_modified)
+    descargador.cerrar()
+
+    assert (primera.estado, primera.etag, primera.last_modified) == (200, ETAG, LAST_MODIFIED)
+    for respuesta in (por_etag, por_fecha):
+        assert respuesta.estado == 304
+        assert respuesta.contenido is None
+        # Los validadores se conservan para el próximo pedido condicional
+        assert respuesta.etag == ETAG
+    assert por_fecha.last_modified == LAST_MODIFIED
+
+
+def test_validadores_en_descargar_todas(servidor):
+    _, base = servidor
+    conocida, nueva = f"{base}/imagen/1", f"{base}/imagen/2"
+
+    respuestas = _descargar_todas(DescargadorImagenes(), [conocida, nueva],
+                                  validadores={conocida: (ETAG, LAST_MODIFIED)})
+
+    assert respuestas[conocida].estado == 304
+    assert respuestas[nueva].estado == 200 and respuestas[nueva].contenido == CONTENIDO
+
+
+def test_timeout_devuelve_contenido_none(servidor):
+    srv, base = servidor
+    srv.demora = 1.0
+    descargador = DescargadorImagenes(timeout=0.2, reintentos=0)
+
+    inicio = time.monotonic()
+    respuesta = descargador.descargar(f"{base}/lenta/1")
+    descargador.cerrar()
+
+    assert respuesta.estado is None and respuesta.contenido is None
+    assert time.monotonic() - inicio < 1.0
+
+
+def test_limite_de_pedidos_por_segundo(servidor):
+    _, base = servidor
+    urls = [f"{base}/imagen/{i}" for i in range(6)]
+
+    inicio = time.monotonic()
+    _descargar_todas(DescargadorPaginas(max_workers=6, por_host=6, pedidos_por_segundo=10), urls)
+
+    # 6 pedidos a 10 por segundo: el último sale, como pronto, 0,5 s después del primero
+    assert time.monotonic() - inicio >= 0.5
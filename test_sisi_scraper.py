@@ -0,0 +1,227 @@
+"""
+test_sisi_scraper.py
+
+Prueba el scraper de SiSi (data/sisi_scraper.py) sin salir a internet:
+
+- el parseo de páginas de producto y del listado, con los HTML guardados
+  en data/fixtures/sisi/;
+- iter_products contra un servidor HTTP local que sirve esas páginas:
+  primero por HTTP, navegador de respaldo (simulado) solo para las que no
+  traen el precio, y pedidos condicionales con ETag que reutilizan el
+  producto anterior cuando la página responde 304.
+
+Ejecuta: python -m pytest test_sisi_scraper.py
+"""
+
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+CARPETA_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+CARPETA_FIXTURES = os.path.join(CARPETA_DATA, "fixtures", "sisi")
+sys.path.insert(0, CARPETA_DATA)
+
+import sisi_scraper
+from descargas import DescargadorPaginas
+from sisi_scraper import extract_links_from_html, iter_products, needs_browser, parse_product_html
+
+
+def _fixture(nombre):
+    with open(os.path.join(CARPETA_FIXTURES, nombre), "rb") as f:
+        return f.read()
+
+
+# ==========================================================
+#                 PARSEO CON HTML GUARDADOS
+# ==========================================================
+def test_parsea_pagina_de_producto():
+    item = parse_product_html(_fixture("producto.html"), "https://sisi.com.uy/catalogo/vestido-lino-ivy_3301")
+
+    assert item == {
+        "nombre": "Vestido Lino Ivy",
+        "precio": "$1.990",  # el de venta, no el de lista tachado
+        "imagen": "https://sisi.com.uy/imgs/catalogo/800x1200/vestido-lino-ivy.jpg",
+        "link": "https://sisi.com.uy/catalogo/vestido-lino-ivy_3301",
+        "marca": "SiSi",
+    }
+
+
+def test_pagina_sin_h1_ni_og_image_util():
+    item = parse_product_html(_fixture("producto_sin_og.html"), "https://sisi.com.uy/catalogo/campera-puffer-alba_3302")
+
+    # Nombre desde og:title, precio que ya trae "$" y la imagen grande (no la de promoción)
+    assert item["nombre"] == "Campera Puffer Alba"
+    assert item["precio"] == "$ 4.290,50"
+    assert item["imagen"] == "https://sisi.com.uy/imgs/catalogo/800x1200/campera-puffer-alba.jpg"
+
+
+def test_pagina_sin_precio_necesita_navegador():
+    item = parse_product_html(_fixture("producto_sin_precio.html"), "https://sisi.com.uy/catalogo/blusa-saten-mia_3311")
+
+    assert item["nombre"] == "Blusa Saten Mia"
+    assert item["precio"] is None
+    assert needs_browser(item)
+    assert not needs_browser(parse_product_html(_fixture("producto_renderizado.html"), item["link"]))
+
+
+@pytest.mark.parametrize("filtrar", [True, False])
+def test_links_del_listado(filtrar):
+    assert extract_links_from_html(_fixture("listado.html"), filtrar=filtrar) == [
+        "https://sisi.com.uy/catalogo/vestido-lino-ivy_3301",
+        "https://sisi.com.uy/catalogo/campera-puffer-alba_3302",
+        "https://sisi.com.uy/catalogo/blusa-saten-mia_3311",
+    ]
+
+
+# ==========================================================
+#           iter_products CONTRA UN SERVIDOR LOCAL
+# ==========================================================
+PAGINAS = {
+    "/catalogo/vestido-lino-ivy_3301": "producto.html",
+    "/catalogo/campera-puffer-alba_3302": "producto_sin_og.html",
+    "/catalogo/blusa-saten-mia_3311": "producto_sin_precio.html",
+}
+
+
+def _etag(ruta):
+    return f'"{ruta.rsplit("_", 1)[-1]}-v1"'
+
+
+class _Tienda(BaseHTTPRequestHandler):
+    """Sirve los HTML guardados con un ETag por página (304 si el pedido condicional coincide)."""
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.pedidos.append((self.path, self.headers.get("If-None-Match")))
+
+        if self.path not in PAGINAS:
+            self.send_response(404)
+            self.end_headers()
+            return
+
+        if self.headers.get("If-None-Match") == _etag(self.path):
+            self.send_response(304)
+            self.send_header("ETag", _etag(self.path))
+            self.end_headers()
+            return
+
+        cuerpo = _fixture(PAGINAS[self.path])
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("ETag", _etag(self.path))
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+
+class _Navegador:
+    """Reemplazo del driver de Selenium: devuelve la página ya renderizada por el JavaScript."""
+
+    def __init__(self, abiertos):
+        self.abiertos = abiertos
+        self.page_source = ""
+        self.cerrado = False
+
+    def get(self, url):
+        self.abiertos.append(url)
+        self.page_source = _fixture("producto_renderizado.html").decode("utf-8")
+
+    def quit(self):
+        self.cerrado = True
+
+
+@pytest.fixture
+def tienda(monkeypatch):
+    """Servidor local con las páginas de PAGINAS; devuelve (servidor, url_base)."""
+    monkeypatch.setattr(sisi_scraper, "PER_PRODUCT_WAIT", 0)
+
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Tienda)
+    srv.daemon_threads = True
+    srv.lock = threading.Lock()
+    srv.pedidos = []
+    hilo = threading.Thread(target=srv.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    hilo.start()
+    yield srv, f"http://127.0.0.1:{srv.server_address[1]}"
+    srv.shutdown()
+    srv.server_close()
+
+
+def _recorrer(links, abiertos, navegadores, **kwargs):
+    """Corre iter_products con un descargador sin límite de ritmo y navegadores simulados."""
+    def crear_driver():
+        navegadores.append(_Navegador(abiertos))
+        return navegadores[-1]
+
+    descargador = DescargadorPaginas(pedidos_por_segundo=None, reintentos=0)
+    try:
+        items = list(iter_products(links, descargador=descargador, browser_workers=1,
+                                   crear_driver=crear_driver, **kwargs))
+    finally:
+        descargador.cerrar()
+    return {item["link"]: item for item in items}
+
+
+def test_http_primero_y_navegador_solo_para_las_que_faltan(tienda):
+    _, base = tienda
+    links = [base + ruta for ruta in PAGINAS]
+    abiertos, navegadores = [], []
+
+    items = _recorrer(links, abiertos, navegadores)
+
+    assert sorted(items) == sorted(links)
+    assert items[base + "/catalogo/vestido-lino-ivy_3301"]["precio"] == "$1.990"
+    assert items[base + "/catalogo/campera-puffer-alba_3302"]["precio"] == "$ 4.290,50"
+
+    # Solo la página sin precio en el HTML se abrió con el navegador
+    assert abiertos == [base + "/catalogo/blusa-saten-mia_3311"]
+    assert items[base + "/catalogo/blusa-saten-mia_3311"]["precio"] == "$1.290"
+    assert len(navegadores) == 1 and navegadores[0].cerrado
+
+
+def test_pagina_que_falla_por_http_va_al_navegador(tienda):
+    _, base = tienda
+    link = base + "/catalogo/no-existe_9999"
+    abiertos, navegadores = [], []
+
+    items = _recorrer([link], abiertos, navegadores)
+
+    assert abiertos == [link]
+    assert items[link]["precio"] == "$1.290"
+
+
+def test_pedidos_condicionales_reutilizan_el_producto_anterior(tienda):
+    srv, base = tienda
+    sin_cambios = base + "/catalogo/vestido-lino-ivy_3301"
+    cambiada = base + "/catalogo/campera-puffer-alba_3302"
+
+    anterior = {"nombre": "Vestido Lino Ivy", "precio": "$1.990", "imagen": "guardada.jpg",
+                "link": sin_cambios, "marca": "SiSi"}
+    validadores = {sin_cambios: (_etag("/catalogo/vestido-lino-ivy_3301"), None),
+                   cambiada: ('"viejo"', None)}
+    nuevos_validadores = {}
+    abiertos, navegadores = [], []
+
+    items = _recorrer([sin_cambios, cambiada], abiertos, navegadores, validadores=validadores,
+                      anteriores={sin_cambios: anterior, cambiada: {"link": cambiada}},
+                      nuevos_validadores=nuevos_validadores)
+
+    # 304: se devuelve el producto guardado tal cual, sin parsear la página
+    assert items[sin_cambios] is anterior
+    # ETag distinto: 200 y se parsea la página nueva
+    assert items[cambiada]["nombre"] == "Campera Puffer Alba"
+    assert not abiertos
+
+    assert sorted(srv.pedidos) == sorted([
+        ("/catalogo/vestido-lino-ivy_3301", _etag("/catalogo/vestido-lino-ivy_3301")),
+        ("/catalogo/campera-puffer-alba_3302", '"viejo"'),
+    ])
+    assert nuevos_validadores == {
+        sin_cambios: (_etag("/catalogo/vestido-lino-ivy_3301"), None),
+        cambiada: (_etag("/catalogo/campera-puffer-alba_3302"), None),
+    }